@@ -34,6 +34,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'estoque.middleware.PerformanceMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -73,6 +74,16 @@ DATABASES = {
     }
 }
 
+# Bancos separados por armazém (opcional), no formato alias:caminho separados por vírgula.
+# Ex.: ARMAZENS_BANCOS=sp:/dados/sp.sqlite3,rj:/dados/rj.sqlite3 e Armazem.banco = 'sp'
+for _alias, _, _caminho in (item.partition(':') for item in config('ARMAZENS_BANCOS', default='').split(',') if item):
+    DATABASES[_alias.strip()] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': _caminho.strip(),
+    }
+
+DATABASE_ROUTERS = ['estoque.bancos.ArmazemRouter']
+
 # Validação de senhas
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -133,6 +144,53 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
 }
 
+# Instrumentação de desempenho por requisição (Server-Timing + log estruturado)
+ESTOQUE_PERFORMANCE = {
+    'ATIVO': config('PERF_ATIVO', default=True, cast=bool),
+    'SERVER_TIMING': config('PERF_SERVER_TIMING', default=True, cast=bool),
+    'LIMITE_QUERIES': config('PERF_LIMITE_QUERIES', default=50, cast=int),
+    'LIMITE_MS': config('PERF_LIMITE_MS', default=1000, cast=int),
+    'LIMITE_DUPLICADAS': config('PERF_LIMITE_DUPLICADAS', default=5, cast=int),
+    # Se definido, /metrics exige o cabeçalho "Authorization: Bearer <token>";
+    # sem token, /metrics só responde com DEBUG=True
+    'METRICAS_TOKEN': config('METRICAS_TOKEN', default=''),
+}
+
+# Cache compartilhado entre os workers do gunicorn (arquivos locais)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('CACHE_DIR', default='/tmp/estoque-cache'),
+    }
+}
+
+# Validade (segundos) do mapa de ocupação em cache
+MAPA_CACHE_TIMEOUT = config('MAPA_CACHE_TIMEOUT', default=60, cast=int)
+
+# Diretório dos arquivos de entrada/saída das tarefas em segundo plano
+TAREFAS_DIR = config('TAREFAS_DIR', default=str(BASE_DIR / 'tarefas'))
+
+# Segundos sem sinal de vida do worker após os quais uma tarefa em execução volta para a fila
+TAREFAS_EXPIRACAO = config('TAREFAS_EXPIRACAO', default=60, cast=int)
+
+# Logs da aplicação no console (coletados pelo Azure)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'estoque': {
+            'handlers': ['console'],
+            'level': config('LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Configurações CORS
 CORS_ALLOWED_ALL_ORIGINS = DEBUG
 CORS_ALLOW_CREDENTIALS = True
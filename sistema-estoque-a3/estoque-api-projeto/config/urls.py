@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.urls import path, include
+from estoque.views import metricas
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -10,6 +11,7 @@ urlpatterns = [
     path('api/', include('estoque.urls')),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('metrics', metricas, name='metricas'),
 ]
 
 # Customizar título do admin
@@ -1,5 +1,12 @@
 from django.contrib import admin
-from .models import Categoria, Marca, Setor, Produto, Escaninho
+from .models import Armazem, Categoria, Marca, Setor, Produto, Escaninho, Tarefa
+
+@admin.register(Armazem)
+class ArmazemAdmin(admin.ModelAdmin):
+    list_display = ['codigo', 'nome', 'banco', 'data_criacao']
+    search_fields = ['codigo', 'nome']
+    readonly_fields = ['data_criacao']
+    filter_horizontal = ['usuarios']
 
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
@@ -25,8 +32,8 @@ class MarcaAdmin(admin.ModelAdmin):
 
 @admin.register(Setor)
 class SetorAdmin(admin.ModelAdmin):
-    list_display = ['letra', 'descricao', 'data_criacao', 'total_escaninhos']
-    list_filter = ['data_criacao']
+    list_display = ['letra', 'armazem', 'descricao', 'data_criacao', 'total_escaninhos']
+    list_filter = ['armazem', 'data_criacao']
     search_fields = ['letra', 'descricao']
     readonly_fields = ['data_criacao']
 
@@ -44,6 +51,7 @@ class ProdutoAdmin(admin.ModelAdmin):
     search_fields = ['nome', 'codigo_registro', 'codigo_barras']
     readonly_fields = ['data_cadastro']
     list_editable = ['em_promocao', 'custo', 'valor_venda']
+    actions = ['colocar_em_promocao', 'retirar_da_promocao']
 
     fieldsets = (
         ('Informações Básicas', {
@@ -53,7 +61,7 @@ class ProdutoAdmin(admin.ModelAdmin):
             'fields': ('categoria', 'marca')
         }),
         ('Valores', {
-            'fields': ('custo', 'valor_venda', 'em_promocao')
+            'fields': ('custo', 'valor_venda', 'em_promocao', 'estoque_minimo')
         }),
         ('Informações Adicionais', {
             'fields': ('informacoes_adicionais', 'data_cadastro'),
@@ -61,16 +69,33 @@ class ProdutoAdmin(admin.ModelAdmin):
         }),
     )
 
+    def colocar_em_promocao(self, request, queryset):
+        atualizados = queryset.update(em_promocao=True)
+        self.message_user(request, f'{atualizados} produto(s) colocados em promoção.')
+    colocar_em_promocao.short_description = 'Colocar produtos selecionados em promoção'
+
+    def retirar_da_promocao(self, request, queryset):
+        atualizados = queryset.update(em_promocao=False)
+        self.message_user(request, f'{atualizados} produto(s) retirados da promoção.')
+    retirar_da_promocao.short_description = 'Retirar produtos selecionados da promoção'
+
 @admin.register(Escaninho)
 class EscaninhoAdmin(admin.ModelAdmin):
     list_display = [
-        'localizacao_completa', 'setor', 'codigo', 'produto', 
+        'localizacao_completa', 'armazem', 'setor', 'codigo', 'produto', 
         'quantidade', 'esta_vazio', 'data_atualizacao'
     ]
-    list_filter = ['setor', 'data_criacao']
+    list_filter = ['armazem', 'setor', 'data_criacao']
     search_fields = ['codigo', 'setor__letra', 'produto__nome']
-    readonly_fields = ['data_criacao', 'data_atualizacao', 'localizacao_completa', 'esta_vazio']
+    readonly_fields = ['armazem', 'data_criacao', 'data_atualizacao', 'localizacao_completa', 'esta_vazio']
 
     def localizacao_completa(self, obj):
         return obj.localizacao_completa
-    localizacao_completa.short_description = 'Localização'
\ No newline at end of file
+    localizacao_completa.short_description = 'Localização'
+
+@admin.register(Tarefa)
+class TarefaAdmin(admin.ModelAdmin):
+    list_display = ['id', 'tipo', 'status', 'user', 'executor', 'data_criacao', 'data_inicio', 'data_conclusao']
+    list_filter = ['status', 'tipo', 'data_criacao']
+    search_fields = ['tipo', 'user__username']
+    readonly_fields = ['data_criacao', 'data_inicio', 'data_conclusao', 'executor', 'heartbeat']
\ No newline at end of file
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class EstoqueConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'estoque'
+
+    def ready(self):
+        # Conecta os sinais de invalidação do cache do mapa do armazém
+        from . import mapa  # noqa: F401
@@ -0,0 +1,59 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Alias do banco do armazém em uso na requisição/comando atual (None = banco padrão)
+_banco_atual = ContextVar('banco_atual', default=None)
+
+# Models de registro que ficam sempre no banco padrão (inclui a tabela M2M de usuários do armazém)
+MODELS_GLOBAIS = {'armazem', 'armazem_usuarios', 'tarefa'}
+
+
+def banco_atual():
+    return _banco_atual.get()
+
+
+def usar_banco(alias):
+    """Direciona as queries seguintes do app estoque para `alias`; retorna o token para restaurar"""
+    return _banco_atual.set(None if alias == 'default' else alias)
+
+
+def restaurar_banco(token):
+    _banco_atual.reset(token)
+
+
+@contextmanager
+def banco_do_armazem(armazem):
+    """Executa o bloco com as queries direcionadas ao banco do armazém"""
+    token = usar_banco(armazem.alias_banco if armazem else None)
+    try:
+        yield
+    finally:
+        restaurar_banco(token)
+
+
+class ArmazemRouter:
+    """
+    Direciona os dados de estoque (setores, escaninhos e catálogo) ao banco do
+    armazém em uso. Armazéns e tarefas ficam sempre no banco padrão.
+    Cada banco de armazém recebe o schema completo (manage.py migrate --database=<alias>).
+    """
+
+    def _banco(self, model):
+        if model._meta.app_label != 'estoque':
+            return None
+        if model._meta.model_name in MODELS_GLOBAIS:
+            # Explícito para não herdar o banco de uma instância relacionada (hint)
+            return 'default'
+        return banco_atual()
+
+    def db_for_read(self, model, **hints):
+        return self._banco(model)
+
+    def db_for_write(self, model, **hints):
+        return self._banco(model)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Setor/Escaninho referenciam o armazém (banco padrão) sem constraint no banco
+        if {obj1._meta.model_name, obj2._meta.model_name} & MODELS_GLOBAIS:
+            return True
+        return None
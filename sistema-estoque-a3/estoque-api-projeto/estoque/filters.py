@@ -1,5 +1,5 @@
 import django_filters
-from .models import Produto
+from .models import Armazem, Produto
 
 class ProdutoFilter(django_filters.FilterSet):
     # Filtro por código de barras (busca parcial)
@@ -8,6 +8,9 @@ class ProdutoFilter(django_filters.FilterSet):
     # Filtro por setor (através dos escaninhos)
     setor = django_filters.CharFilter(field_name='escaninhos__setor__letra', lookup_expr='iexact')
     
+    # Filtro por armazém (código), através dos escaninhos
+    armazem = django_filters.CharFilter(method='filtrar_armazem')
+    
     # Filtro por escaninho específico
     escaninho = django_filters.CharFilter(field_name='escaninhos__codigo', lookup_expr='iexact')
     
@@ -32,6 +35,13 @@ class ProdutoFilter(django_filters.FilterSet):
         model = Produto
         fields = [
             'codigo_registro', 'codigo_barras', 'categoria', 'marca',
-            'em_promocao', 'setor', 'escaninho', 'marca_nome', 'categoria_nome',
+            'em_promocao', 'armazem', 'setor', 'escaninho', 'marca_nome', 'categoria_nome',
             'preco_min', 'preco_max', 'data_cadastro_inicio', 'data_cadastro_fim'
-        ]
\ No newline at end of file
+        ]
+
+    def filtrar_armazem(self, queryset, name, value):
+        # O registro de armazéns pode estar em outro banco: resolve o id antes de filtrar
+        armazem_id = Armazem.objects.filter(codigo__iexact=value).values_list('pk', flat=True).first()
+        if armazem_id is None:
+            return queryset.none()
+        return queryset.filter(escaninhos__armazem_id=armazem_id).distinct()
\ No newline at end of file
@@ -0,0 +1,391 @@
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
+from estoque.bancos import banco_do_armazem
+from estoque.models import Armazem, Categoria, Marca, Setor, Produto, Escaninho
+
+
+def _regex_do_campo(model, campo):
+    """Reaproveita a regex do RegexValidator do model (mesma regra da API/admin)"""
+    for validator in model._meta.get_field(campo).validators:
+        if hasattr(validator, 'regex'):
+            return validator.regex
+    raise CommandError(f'{model.__name__}.{campo} não possui RegexValidator')
+
+
+def _ler_csv(caminho):
+    with open(caminho, newline='', encoding='utf-8-sig') as arquivo:
+        amostra = arquivo.read(4096)
+        arquivo.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=',;\t')
+        except csv.Error:
+            # Arquivos de uma única coluna não têm delimitador a detectar
+            dialeto = csv.excel
+        for linha in csv.DictReader(arquivo, dialect=dialeto):
+            yield {chave.strip(): (valor or '').strip() for chave, valor in linha.items() if chave}
+
+
+def _ler_excel(caminho):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise CommandError('Importação de planilhas Excel requer o pacote openpyxl (pip install openpyxl).')
+
+    planilha = load_workbook(caminho, read_only=True, data_only=True).active
+    linhas = planilha.iter_rows(values_only=True)
+    cabecalho = [str(coluna).strip() for coluna in next(linhas, ())]
+    for valores in linhas:
+        yield {
+            coluna: '' if valor is None else str(valor).strip()
+            for coluna, valor in zip(cabecalho, valores)
+        }
+
+
+def ler_linhas(caminho):
+    """Lê um arquivo CSV ou Excel linha a linha, sem carregá-lo inteiro na memória"""
+    if Path(caminho).suffix.lower() in ('.xlsx', '.xlsm'):
+        return _ler_excel(caminho)
+    return _ler_csv(caminho)
+
+
+def _decimal(valor):
+    return Decimal(valor.replace('.', '').replace(',', '.') if ',' in valor else valor)
+
+
+def _booleano(valor):
+    return valor.lower() in ('1', 'true', 'sim', 's', 'x')
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa categorias, marcas, setores, produtos e escaninhos a partir de '
+        'arquivos CSV/Excel em lotes (bulk_create), com retomada após falhas.'
+    )
+
+    # Ordem de importação respeitando as dependências entre os models
+    ORDEM = ['categorias', 'marcas', 'setores', 'produtos', 'escaninhos']
+    MODELS = {
+        'categorias': Categoria,
+        'marcas': Marca,
+        'setores': Setor,
+        'produtos': Produto,
+        'escaninhos': Escaninho,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categorias', help='Arquivo com a coluna: nome')
+        parser.add_argument('--marcas', help='Arquivo com as colunas: nome, cnpj')
+        parser.add_argument('--setores', help='Arquivo com as colunas: letra, descricao')
+        parser.add_argument(
+            '--produtos',
+            help='Arquivo com as colunas: nome, codigo_registro, codigo_barras, categoria, marca, '
+                 'custo, valor_venda, informacoes_adicionais, em_promocao, estoque_minimo'
+        )
+        parser.add_argument(
+            '--escaninhos',
+            help='Arquivo com as colunas: setor, codigo, produto (codigo_registro), quantidade'
+        )
+        parser.add_argument(
+            '--armazem',
+            help='Código do armazém de destino de setores e escaninhos (obrigatório se houver mais de um)'
+        )
+        parser.add_argument('--lote', type=int, default=5000, help='Linhas por lote (padrão: 5000)')
+        parser.add_argument(
+            '--checkpoint', default='.importar_estoque.json',
+            help='Arquivo onde o progresso de cada arquivo é salvo após cada lote'
+        )
+        parser.add_argument(
+            '--retomar', action='store_true',
+            help='Retoma a partir do último lote concluído registrado no checkpoint'
+        )
+        parser.add_argument('--erros', help='Grava as linhas rejeitadas (com o motivo) neste CSV')
+
+    def handle(self, *args, **options):
+        arquivos = [(tipo, options[tipo]) for tipo in self.ORDEM if options[tipo]]
+        if not arquivos:
+            raise CommandError('Informe ao menos um arquivo (--categorias, --marcas, --setores, --produtos, --escaninhos).')
+        if options['lote'] < 1:
+            raise CommandError('--lote deve ser maior que zero.')
+
+        self.lote = options['lote']
+        self.verbosity = options['verbosity']
+        self.caminho_checkpoint = Path(options['checkpoint'])
+        self.checkpoint = {}
+        if options['retomar'] and self.caminho_checkpoint.exists():
+            self.checkpoint = json.loads(self.caminho_checkpoint.read_text())
+
+        self.regex_cnpj = _regex_do_campo(Marca, 'cnpj')
+        self.regex_letra = _regex_do_campo(Setor, 'letra')
+        self.regex_barras = _regex_do_campo(Produto, 'codigo_barras')
+        self.regex_escaninho = _regex_do_campo(Escaninho, 'codigo')
+
+        self.armazem = self._resolver_armazem(options['armazem'])
+
+        self.arquivo_erros = None
+        self.escritor_erros = None
+        if options['erros']:
+            self.arquivo_erros = open(options['erros'], 'w', newline='', encoding='utf-8')
+            self.escritor_erros = csv.writer(self.arquivo_erros)
+            self.escritor_erros.writerow(['arquivo', 'linha', 'motivo'])
+
+        try:
+            # Todos os dados vão para o banco do armazém (Armazem.banco)
+            with banco_do_armazem(self.armazem):
+                for tipo, caminho in arquivos:
+                    if not Path(caminho).exists():
+                        raise CommandError(f'Arquivo não encontrado: {caminho}')
+                    self._importar(tipo, caminho)
+        finally:
+            if self.arquivo_erros:
+                self.arquivo_erros.close()
+
+    def _resolver_armazem(self, codigo):
+        if codigo:
+            try:
+                return Armazem.objects.get(codigo__iexact=codigo)
+            except Armazem.DoesNotExist:
+                raise CommandError(f'Armazém não encontrado: {codigo}')
+        armazens = list(Armazem.objects.all()[:2])
+        if len(armazens) != 1:
+            raise CommandError('Informe o armazém de destino com --armazem.')
+        return armazens[0]
+
+    def _importar(self, tipo, caminho):
+        preparar = getattr(self, f'_preparar_{tipo}')
+        model = self.MODELS[tipo]
+        chave = str(Path(caminho).resolve())
+        ja_processadas = self.checkpoint.get(chave, 0)
+
+        # Mapas nome -> id carregados uma única vez por arquivo
+        self.categorias = dict(Categoria.objects.values_list('nome', 'id'))
+        self.marcas = dict(Marca.objects.values_list('nome', 'id'))
+        self.setores = dict(Setor.objects.filter(armazem_id=self.armazem.pk).values_list('letra', 'id'))
+
+        linhas = ler_linhas(caminho)
+        if ja_processadas:
+            self.stdout.write(f'{tipo}: retomando após {ja_processadas} linhas já importadas')
+            # Pula as linhas já processadas sem convertê-las
+            for _ in islice(linhas, ja_processadas):
+                pass
+
+        processadas = ja_processadas
+        inseridas = rejeitadas = 0
+        inicio = time.perf_counter()
+        while True:
+            lote = list(islice(linhas, self.lote))
+            if not lote:
+                break
+
+            # Número da linha no arquivo (cabeçalho = linha 1)
+            primeira = processadas + 2
+            objetos, erros = preparar(lote, primeira)
+            # O bulk_create vai para o banco do armazém; a transação precisa ser aberta nele
+            with transaction.atomic(using=router.db_for_write(model)):
+                model.objects.bulk_create(objetos, batch_size=self.lote)
+
+            processadas += len(lote)
+            inseridas += len(objetos)
+            rejeitadas += len(erros)
+            self._registrar_erros(caminho, erros)
+            self._salvar_checkpoint(chave, processadas)
+
+            if self.verbosity >= 2:
+                decorrido = time.perf_counter() - inicio
+                self.stdout.write(
+                    f'  {tipo}: {processadas} linhas ({(processadas - ja_processadas) / decorrido:.0f} linhas/s)'
+                )
+
+        # Arquivo concluído: uma nova execução (mesmo com --retomar) o importa desde o início
+        self._remover_checkpoint(chave)
+
+        decorrido = time.perf_counter() - inicio
+        taxa = (processadas - ja_processadas) / decorrido if decorrido else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{tipo}: {inseridas} inseridos, {rejeitadas} rejeitados, '
+            f'{processadas - ja_processadas} linhas em {decorrido:.1f}s ({taxa:.0f} linhas/s)'
+        ))
+
+    def _registrar_erros(self, caminho, erros):
+        if self.escritor_erros:
+            self.escritor_erros.writerows([caminho, linha, motivo] for linha, motivo in erros)
+        elif erros and self.verbosity >= 1:
+            for linha, motivo in erros[:5]:
+                self.stderr.write(f'  {Path(caminho).name}:{linha}: {motivo}')
+            if len(erros) > 5:
+                self.stderr.write(f'  ... e mais {len(erros) - 5} linhas rejeitadas neste lote')
+
+    def _salvar_checkpoint(self, chave, processadas):
+        self.checkpoint[chave] = processadas
+        self.caminho_checkpoint.write_text(json.dumps(self.checkpoint))
+
+    def _remover_checkpoint(self, chave):
+        if self.checkpoint.pop(chave, None) is None:
+            return
+        if self.checkpoint:
+            self.caminho_checkpoint.write_text(json.dumps(self.checkpoint))
+        else:
+            self.caminho_checkpoint.unlink(missing_ok=True)
+
+    def _filtrar(self, lote, primeira, colunas, validacoes, existentes):
+        """
+        Valida o lote coluna a coluna e devolve (linhas válidas, erros).
+        `validacoes` é uma lista de (coluna, regex, mensagem) e `existentes`
+        mapeia cada coluna única para os valores já presentes no banco.
+        """
+        erros = {}
+        for coluna in colunas:
+            valores = [linha.get(coluna, '') for linha in lote]
+            for indice in (i for i, valor in enumerate(valores) if not valor):
+                erros.setdefault(indice, f'coluna "{coluna}" vazia')
+
+        for coluna, regex, mensagem in validacoes:
+            valores = [linha.get(coluna, '') for linha in lote]
+            for indice in (i for i, valor in enumerate(valores) if not regex.match(valor)):
+                erros.setdefault(indice, mensagem)
+
+        for coluna, valores_existentes in existentes.items():
+            vistos = set()
+            for indice, linha in enumerate(lote):
+                valor = linha.get(coluna, '')
+                if valor in valores_existentes:
+                    erros.setdefault(indice, f'{coluna} "{valor}" já cadastrado')
+                elif valor in vistos:
+                    erros.setdefault(indice, f'{coluna} "{valor}" duplicado no arquivo')
+                vistos.add(valor)
+
+        validas = [(primeira + i, linha) for i, linha in enumerate(lote) if i not in erros]
+        return validas, sorted((primeira + i, motivo) for i, motivo in erros.items())
+
+    def _preparar_categorias(self, lote, primeira):
+        nomes = {linha.get('nome', '') for linha in lote}
+        existentes = {'nome': set(Categoria.objects.filter(nome__in=nomes).values_list('nome', flat=True))}
+        validas, erros = self._filtrar(lote, primeira, ['nome'], [], existentes)
+        return [Categoria(nome=linha['nome']) for _, linha in validas], erros
+
+    def _preparar_marcas(self, lote, primeira):
+        nomes = {linha.get('nome', '') for linha in lote}
+        cnpjs = {linha.get('cnpj', '') for linha in lote}
+        existentes = {
+            'nome': set(Marca.objects.filter(nome__in=nomes).values_list('nome', flat=True)),
+            'cnpj': set(Marca.objects.filter(cnpj__in=cnpjs).values_list('cnpj', flat=True)),
+        }
+        validacoes = [('cnpj', self.regex_cnpj, 'CNPJ deve estar no formato XX.XXX.XXX/XXXX-XX')]
+        validas, erros = self._filtrar(lote, primeira, ['nome', 'cnpj'], validacoes, existentes)
+        return [Marca(nome=linha['nome'], cnpj=linha['cnpj']) for _, linha in validas], erros
+
+    def _preparar_setores(self, lote, primeira):
+        for linha in lote:
+            linha['letra'] = linha.get('letra', '').upper()
+        letras = {linha['letra'] for linha in lote}
+        existentes = {'letra': set(
+            Setor.objects.filter(armazem_id=self.armazem.pk, letra__in=letras).values_list('letra', flat=True)
+        )}
+        validacoes = [('letra', self.regex_letra, 'Setor deve ser uma letra maiúscula (A-Z)')]
+        validas, erros = self._filtrar(lote, primeira, ['letra'], validacoes, existentes)
+        return [
+            Setor(armazem_id=self.armazem.pk, letra=linha['letra'], descricao=linha.get('descricao', ''))
+            for _, linha in validas
+        ], erros
+
+    def _preparar_produtos(self, lote, primeira):
+        registros = {linha.get('codigo_registro', '') for linha in lote}
+        barras = {linha.get('codigo_barras', '') for linha in lote}
+        existentes = {
+            'codigo_registro': set(
+                Produto.objects.filter(codigo_registro__in=registros).values_list('codigo_registro', flat=True)
+            ),
+            'codigo_barras': set(
+                Produto.objects.filter(codigo_barras__in=barras).values_list('codigo_barras', flat=True)
+            ),
+        }
+        validacoes = [('codigo_barras', self.regex_barras, 'Código de barras deve conter apenas números')]
+        obrigatorias = ['nome', 'codigo_registro', 'codigo_barras', 'categoria', 'marca', 'custo', 'valor_venda']
+        validas, erros = self._filtrar(lote, primeira, obrigatorias, validacoes, existentes)
+
+        objetos = []
+        for numero, linha in validas:
+            categoria_id = self.categorias.get(linha['categoria'])
+            marca_id = self.marcas.get(linha['marca'])
+            if categoria_id is None:
+                erros.append((numero, f'categoria "{linha["categoria"]}" não encontrada'))
+                continue
+            if marca_id is None:
+                erros.append((numero, f'marca "{linha["marca"]}" não encontrada'))
+                continue
+            try:
+                custo = _decimal(linha['custo'])
+                valor_venda = _decimal(linha['valor_venda'])
+            except InvalidOperation:
+                erros.append((numero, 'custo/valor_venda inválido'))
+                continue
+            estoque_minimo = linha.get('estoque_minimo') or '0'
+            if not estoque_minimo.isdigit():
+                erros.append((numero, 'estoque_minimo deve ser um inteiro não negativo'))
+                continue
+            objetos.append(Produto(
+                nome=linha['nome'],
+                codigo_registro=linha['codigo_registro'],
+                codigo_barras=linha['codigo_barras'],
+                categoria_id=categoria_id,
+                marca_id=marca_id,
+                custo=custo,
+                valor_venda=valor_venda,
+                informacoes_adicionais=linha.get('informacoes_adicionais') or None,
+                em_promocao=_booleano(linha.get('em_promocao', '')),
+                estoque_minimo=int(estoque_minimo),
+            ))
+        return objetos, erros
+
+    def _preparar_escaninhos(self, lote, primeira):
+        for linha in lote:
+            linha['setor'] = linha.get('setor', '').upper()
+            # Chave única (setor, codigo) em uma única coluna para a checagem de duplicados
+            linha['_chave'] = f"{linha['setor']}-{linha.get('codigo', '')}"
+
+        codigos = {linha.get('codigo', '') for linha in lote}
+        existentes = {
+            '_chave': {
+                f'{letra}-{codigo}'
+                for letra, codigo in Escaninho.objects.filter(armazem_id=self.armazem.pk, codigo__in=codigos)
+                .values_list('setor__letra', 'codigo')
+            }
+        }
+        validacoes = [('codigo', self.regex_escaninho, 'Código do escaninho deve conter apenas números')]
+        validas, erros = self._filtrar(lote, primeira, ['setor', 'codigo'], validacoes, existentes)
+
+        # Produtos resolvidos por codigo_registro com uma query por lote
+        registros = {linha['produto'] for _, linha in validas if linha.get('produto')}
+        produtos = dict(
+            Produto.objects.filter(codigo_registro__in=registros).values_list('codigo_registro', 'id')
+        )
+
+        objetos = []
+        for numero, linha in validas:
+            setor_id = self.setores.get(linha['setor'])
+            if setor_id is None:
+                erros.append((numero, f'setor "{linha["setor"]}" não encontrado'))
+                continue
+            produto_id = None
+            if linha.get('produto'):
+                produto_id = produtos.get(linha['produto'])
+                if produto_id is None:
+                    erros.append((numero, f'produto "{linha["produto"]}" não encontrado'))
+                    continue
+            quantidade = linha.get('quantidade') or '0'
+            if not quantidade.isdigit():
+                erros.append((numero, 'quantidade deve ser um inteiro não negativo'))
+                continue
+            objetos.append(Escaninho(
+                armazem_id=self.armazem.pk,
+                codigo=linha['codigo'],
+                setor_id=setor_id,
+                produto_id=produto_id,
+                quantidade=int(quantidade),
+            ))
+        return objetos, erros
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.migrations.executor import MigrationExecutor
+
+
+class Command(BaseCommand):
+    help = (
+        'Aplica as migrações pendentes no banco padrão e nos bancos dos armazéns '
+        '(ARMAZENS_BANCOS), pulando os que já estão em dia. Usado no boot (startup.sh).'
+    )
+
+    def handle(self, *args, **options):
+        for alias in settings.DATABASES:
+            executor = MigrationExecutor(connections[alias])
+            plano = executor.migration_plan(executor.loader.graph.leaf_nodes())
+            if not plano:
+                self.stdout.write(f'{alias}: nenhuma migração pendente')
+                continue
+            self.stdout.write(f'{alias}: {len(plano)} migração(ões) pendente(s)')
+            call_command('migrate', database=alias, interactive=False, verbosity=options['verbosity'])
@@ -0,0 +1,129 @@
+import os
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connections
+from estoque.models import Tarefa
+from estoque.tarefas import reservar, renovar, executar, recuperar_interrompidas, devolver, marcar_falha
+
+
+def _inicializar_processo():
+    # Cada processo do pool abre suas próprias conexões com o banco
+    connections.close_all()
+
+
+def _executar(tarefa_id):
+    try:
+        return tarefa_id, executar(tarefa_id)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Worker que executa as tarefas pendentes (exportações, importações) em um pool de processos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processos', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+            help='Tamanho do pool de processos (padrão: metade das CPUs)'
+        )
+        parser.add_argument(
+            '--intervalo', type=float, default=1.0,
+            help='Segundos entre consultas à fila quando não há tarefas pendentes'
+        )
+        parser.add_argument(
+            '--uma-vez', action='store_true',
+            help='Processa as tarefas pendentes e encerra (útil para cron e testes)'
+        )
+
+    def handle(self, *args, **options):
+        processos = options['processos']
+        # Identifica as tarefas reservadas por este worker entre as instâncias que dividem o banco
+        self.executor = f'{socket.gethostname()}:{os.getpid()}'
+        self.ultimo_sinal = 0.0
+        self.stdout.write(f'Worker de tarefas {self.executor} iniciado com {processos} processo(s)')
+
+        try:
+            # Um processo que morre (ex.: falta de memória) quebra o pool inteiro; recria e continua
+            while self._processar(processos, options):
+                self.stderr.write('Pool de processos quebrado; reiniciando')
+        except KeyboardInterrupt:
+            self.stdout.write('Encerrando worker; aguardando tarefas em execução...')
+
+    def _processar(self, processos, options):
+        """Consome a fila até encerrar (retorna False) ou o pool quebrar (retorna True)"""
+        # Conexões do processo pai não podem ser herdadas pelos filhos
+        connections.close_all()
+        em_execucao = {}
+        with ProcessPoolExecutor(max_workers=processos, initializer=_inicializar_processo) as pool:
+            while True:
+                self._sinal_de_vida(em_execucao)
+                quebrado = False
+                for futuro in [f for f in em_execucao if f.done()]:
+                    quebrado |= self._finalizar(futuro, em_execucao.pop(futuro))
+
+                livres = processos - len(em_execucao)
+                if livres > 0 and not quebrado:
+                    try:
+                        pendentes = Tarefa.objects.filter(status=Tarefa.PENDENTE).order_by('data_criacao')
+                        for tarefa_id in pendentes.values_list('pk', flat=True)[:livres]:
+                            if reservar(tarefa_id, self.executor):
+                                try:
+                                    em_execucao[pool.submit(_executar, tarefa_id)] = tarefa_id
+                                except BrokenProcessPool:
+                                    # Reservada mas não iniciada: volta para a fila
+                                    devolver(tarefa_id, self.executor)
+                                    quebrado = True
+                                    break
+                    except DatabaseError as erro:
+                        self.stderr.write(f'Erro ao consultar a fila de tarefas: {erro}')
+                    finally:
+                        connections.close_all()
+
+                if quebrado:
+                    # Ao quebrar, o pool encerra com erro todas as tarefas em andamento
+                    for futuro, tarefa_id in em_execucao.items():
+                        self._finalizar(futuro, tarefa_id)
+                    return True
+                if options['uma_vez'] and not em_execucao:
+                    return False
+                time.sleep(options['intervalo'] if not em_execucao else 0.1)
+
+    def _sinal_de_vida(self, em_execucao):
+        """
+        A cada terço de TAREFAS_EXPIRACAO renova o heartbeat das tarefas deste worker e
+        devolve à fila as de workers que pararam (inclusive os de instâncias encerradas)
+        """
+        if time.monotonic() - self.ultimo_sinal < settings.TAREFAS_EXPIRACAO / 3:
+            return
+        self.ultimo_sinal = time.monotonic()
+        try:
+            if em_execucao:
+                renovar(list(em_execucao.values()), self.executor)
+            recuperadas = recuperar_interrompidas()
+            if recuperadas:
+                self.stdout.write(f'{recuperadas} tarefa(s) interrompida(s) devolvida(s) à fila')
+        except DatabaseError as erro:
+            self.stderr.write(f'Erro ao renovar as tarefas em execução: {erro}')
+        finally:
+            connections.close_all()
+
+    def _finalizar(self, futuro, tarefa_id):
+        """Registra o fim da tarefa; retorna True se o pool de processos quebrou"""
+        # Falhas fora da tarefa (banco indisponível, processo morto) não derrubam o worker
+        try:
+            _, status = futuro.result()
+        except Exception as erro:
+            try:
+                status = marcar_falha(tarefa_id, f'{type(erro).__name__}: {erro}')
+            except DatabaseError as erro_banco:
+                status = f'falha não registrada ({erro_banco})'
+            finally:
+                connections.close_all()
+            self.stderr.write(f'Tarefa {tarefa_id}: {status}')
+            return isinstance(erro, BrokenProcessPool)
+        self.stdout.write(f'Tarefa {tarefa_id}: {status}')
+        return False
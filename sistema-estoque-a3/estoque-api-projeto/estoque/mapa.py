@@ -0,0 +1,78 @@
+import hashlib
+import json
+from django.core.cache import cache
+from django.db.models import IntegerField
+from django.db.models.functions import Cast
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .bancos import banco_atual
+from .metricas import registrar_cache
+from .models import Setor, Produto, Escaninho
+
+CHAVE_CACHE = 'estoque:mapa_armazem'
+# Incrementada a cada alteração; invalida de uma vez os mapas de todos os armazéns
+CHAVE_VERSAO = 'estoque:mapa_armazem:versao'
+
+
+def montar_mapa(armazens=None):
+    """
+    Monta o mapa de ocupação de todos os setores em formato colunar, a partir de
+    uma única query. Cada setor traz arrays paralelos (códigos, produtos,
+    quantidades, vazios) e os nomes dos produtos vêm uma única vez no dicionário
+    'produtos', indexado pelo id. `armazens` restringe o mapa a esses ids.
+    """
+    setores = Setor.objects.all()
+    if armazens is not None:
+        setores = setores.filter(armazem__in=armazens)
+    # Códigos só têm dígitos: ordem numérica ('2' antes de '10'), a ordem física no setor
+    linhas = setores.order_by('armazem_id', 'letra', Cast('escaninhos__codigo', IntegerField())).values_list(
+        'id', 'armazem_id', 'letra', 'escaninhos__codigo', 'escaninhos__produto_id',
+        'escaninhos__quantidade', 'escaninhos__produto__nome'
+    )
+
+    resultado = []
+    produtos = {}
+    atual = None
+    for setor_id, armazem_id, letra, codigo, produto_id, quantidade, produto_nome in linhas:
+        if atual is None or atual['id'] != setor_id:
+            atual = {
+                'id': setor_id, 'armazem': armazem_id, 'letra': letra, 'codigos': [], 'produtos': [], 'quantidades': [], 'vazios': []
+            }
+            resultado.append(atual)
+        # Setor sem escaninhos (LEFT JOIN sem correspondência)
+        if codigo is None:
+            continue
+        atual['codigos'].append(codigo)
+        atual['produtos'].append(produto_id)
+        atual['quantidades'].append(quantidade)
+        atual['vazios'].append(produto_id is None or quantidade == 0)
+        if produto_id is not None:
+            produtos[produto_id] = produto_nome
+
+    return {'setores': resultado, 'produtos': produtos}
+
+
+def obter_mapa(timeout, armazens=None):
+    """Retorna (mapa, etag) do cache ou monta o mapa e o armazena por `timeout` segundos"""
+    versao = cache.get_or_set(CHAVE_VERSAO, 1, None)
+    escopo = 'todos' if armazens is None else ','.join(map(str, sorted(armazens)))
+    chave = f'{CHAVE_CACHE}:{versao}:{banco_atual() or "default"}:{escopo}'
+    em_cache = cache.get(chave)
+    registrar_cache('mapa_armazem', em_cache is not None)
+    if em_cache is None:
+        mapa = montar_mapa(armazens)
+        etag = hashlib.md5(json.dumps(mapa, sort_keys=True).encode()).hexdigest()
+        em_cache = (mapa, f'"{etag}"')
+        cache.set(chave, em_cache, timeout)
+    return em_cache
+
+
+@receiver([post_save, post_delete], sender=Setor)
+@receiver([post_save, post_delete], sender=Produto)
+@receiver([post_save, post_delete], sender=Escaninho)
+def invalidar_mapa(sender, **kwargs):
+    # Alterações em massa (update/bulk_create) não disparam sinais; o timeout cobre esses casos
+    try:
+        cache.incr(CHAVE_VERSAO)
+    except ValueError:
+        cache.set(CHAVE_VERSAO, 1, None)
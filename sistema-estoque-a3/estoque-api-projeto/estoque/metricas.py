@@ -0,0 +1,83 @@
+"""
+Métricas da aplicação no formato de texto do Prometheus.
+
+Com a variável PROMETHEUS_MULTIPROC_DIR definida (ver gunicorn.conf.py), cada
+worker do gunicorn grava seus valores em arquivos mmap nesse diretório e o
+endpoint /metrics agrega todos eles, de modo que qualquer worker responde com
+os totais do servidor inteiro.
+"""
+import os
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY,
+    CONTENT_TYPE_LATEST, generate_latest, multiprocess,
+)
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REQUISICOES = Counter(
+    'estoque_requisicoes_total',
+    'Requisições atendidas por viewset, ação e status',
+    ['viewset', 'acao', 'metodo', 'status'],
+)
+ERROS = Counter(
+    'estoque_requisicoes_erros_total',
+    'Requisições que terminaram com status 5xx',
+    ['viewset', 'acao'],
+)
+LATENCIA = Histogram(
+    'estoque_requisicao_duracao_segundos',
+    'Latência das requisições por viewset e ação',
+    ['viewset', 'acao'],
+    buckets=BUCKETS_LATENCIA,
+)
+QUERIES = Counter(
+    'estoque_db_queries_total',
+    'Queries SQL executadas por viewset e ação',
+    ['viewset', 'acao'],
+)
+TEMPO_DB = Counter(
+    'estoque_db_duracao_segundos_total',
+    'Tempo gasto no banco de dados por viewset e ação',
+    ['viewset', 'acao'],
+)
+# Taxa de acerto = rate(resultado="acerto") / rate(todos os resultados)
+CACHE = Counter(
+    'estoque_cache_consultas_total',
+    'Consultas ao cache da aplicação por resultado (acerto/falha)',
+    ['cache', 'resultado'],
+)
+
+
+def _separar_rotulo(rotulo):
+    """'ProdutoViewSet.promocoes' -> ('ProdutoViewSet', 'promocoes')"""
+    if not rotulo:
+        return 'desconhecida', ''
+    viewset, _, acao = rotulo.partition('.')
+    return viewset, acao
+
+
+def registrar_requisicao(medicao, metodo, status):
+    """Registra as métricas de uma requisição medida pelo PerformanceMiddleware"""
+    viewset, acao = _separar_rotulo(medicao.acao)
+    REQUISICOES.labels(viewset, acao, metodo, str(status)).inc()
+    LATENCIA.labels(viewset, acao).observe(medicao.duracao)
+    if status >= 500:
+        ERROS.labels(viewset, acao).inc()
+    if medicao.total_queries:
+        QUERIES.labels(viewset, acao).inc(medicao.total_queries)
+        TEMPO_DB.labels(viewset, acao).inc(medicao.tempo_db)
+
+
+def registrar_cache(cache, acerto):
+    """Contabiliza uma consulta ao cache `cache`"""
+    CACHE.labels(cache, 'acerto' if acerto else 'falha').inc()
+
+
+def gerar_metricas():
+    """Retorna (conteúdo, content_type) com as métricas de todos os workers"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
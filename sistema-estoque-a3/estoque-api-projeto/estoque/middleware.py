@@ -0,0 +1,117 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from .metricas import registrar_requisicao
+from .performance import Medicao, _medicao_atual
+
+logger = logging.getLogger('estoque.performance')
+
+
+def _rotulo_da_view(request, view_func):
+    """Resolve o rótulo 'ViewSet.acao' (ou o nome da rota para views comuns)"""
+    cls = getattr(view_func, 'cls', None)
+    acoes = getattr(view_func, 'actions', None)
+    if cls is not None and acoes:
+        acao = acoes.get(request.method.lower())
+        if acao:
+            return f'{cls.__name__}.{acao}'
+    if cls is not None:
+        return cls.__name__
+    match = request.resolver_match
+    if match is not None and match.view_name:
+        return match.view_name
+    return getattr(view_func, '__name__', 'desconhecida')
+
+
+class PerformanceMiddleware:
+    """
+    Instrumenta cada requisição com:
+    - número de queries e tempo de banco
+    - tempo de serialização e de renderização
+    - ação do viewset resolvida
+    Publica as métricas no cabeçalho Server-Timing e em log estruturado (JSON),
+    sinalizando requisições lentas e queries repetidas (N+1).
+    As mesmas medições alimentam as métricas expostas em /metrics.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = getattr(settings, 'ESTOQUE_PERFORMANCE', {})
+        self.ativo = config.get('ATIVO', True)
+        self.server_timing = config.get('SERVER_TIMING', True)
+        self.limite_queries = config.get('LIMITE_QUERIES', 50)
+        self.limite_ms = config.get('LIMITE_MS', 1000)
+        self.limite_duplicadas = config.get('LIMITE_DUPLICADAS', 5)
+
+    def __call__(self, request):
+        if not self.ativo:
+            return self.get_response(request)
+
+        medicao = Medicao()
+        token = _medicao_atual.set(medicao)
+        try:
+            with ExitStack() as stack:
+                for conexao in connections.all():
+                    stack.enter_context(conexao.execute_wrapper(medicao))
+                response = self.get_response(request)
+        finally:
+            _medicao_atual.reset(token)
+            medicao.finalizar()
+
+        if self.server_timing:
+            response['Server-Timing'] = self._server_timing(medicao)
+        self._registrar(request, response, medicao)
+        registrar_requisicao(medicao, request.method, response.status_code)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        medicao = _medicao_atual.get()
+        if medicao is not None:
+            medicao.acao = _rotulo_da_view(request, view_func)
+        return None
+
+    def process_template_response(self, request, response):
+        # Respostas do DRF são renderizadas depois deste ponto
+        medicao = _medicao_atual.get()
+        if medicao is not None:
+            medicao.inicio_renderizacao = time.perf_counter()
+            response.add_post_render_callback(medicao.finalizar_renderizacao)
+        return response
+
+    def _server_timing(self, medicao):
+        return ', '.join([
+            f'db;dur={medicao.tempo_db * 1000:.1f};desc="{medicao.total_queries} queries"',
+            f'serializer;dur={medicao.tempo_serializacao * 1000:.1f}',
+            f'render;dur={medicao.tempo_renderizacao * 1000:.1f}',
+            f'total;dur={medicao.duracao * 1000:.1f}',
+        ])
+
+    def _registrar(self, request, response, medicao):
+        duracao_ms = medicao.duracao * 1000
+        dados = {
+            'metodo': request.method,
+            'caminho': request.path,
+            'status': response.status_code,
+            'acao': medicao.acao,
+            'duracao_ms': round(duracao_ms, 1),
+            'queries': medicao.total_queries,
+            'db_ms': round(medicao.tempo_db * 1000, 1),
+            'serializacao_ms': round(medicao.tempo_serializacao * 1000, 1),
+            'renderizacao_ms': round(medicao.tempo_renderizacao * 1000, 1),
+        }
+
+        duplicadas = medicao.duplicadas(self.limite_duplicadas)
+        lenta = (
+            duracao_ms > self.limite_ms
+            or medicao.total_queries > self.limite_queries
+            or bool(duplicadas)
+        )
+        if lenta:
+            dados['lenta'] = True
+            dados['queries_duplicadas'] = duplicadas
+            logger.warning(json.dumps(dados, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(dados, ensure_ascii=False))
@@ -0,0 +1,43 @@
+# Generated by Django 5.0 on 2026-10-19 15:47
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0002_tarefa'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Armazem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigo', models.CharField(max_length=20, unique=True, validators=[django.core.validators.RegexValidator(message='Código do armazém deve conter apenas letras maiúsculas, números, "_" ou "-"', regex='^[A-Z0-9_-]+$')])),
+                ('nome', models.CharField(max_length=100)),
+                ('banco', models.CharField(blank=True, help_text='Alias em DATABASES onde ficam os dados deste armazém (vazio = banco padrão)', max_length=50)),
+                ('data_criacao', models.DateTimeField(auto_now_add=True)),
+                ('usuarios', models.ManyToManyField(blank=True, related_name='armazens', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Armazém',
+                'verbose_name_plural': 'Armazéns',
+                'ordering': ['codigo'],
+            },
+        ),
+        migrations.AddField(
+            model_name='escaninho',
+            name='armazem',
+            field=models.ForeignKey(db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='escaninhos', to='estoque.armazem'),
+        ),
+        migrations.AddField(
+            model_name='setor',
+            name='armazem',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='setores', to='estoque.armazem'),
+        ),
+    ]
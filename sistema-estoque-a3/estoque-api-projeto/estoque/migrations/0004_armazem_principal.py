@@ -0,0 +1,36 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def criar_armazem_principal(apps, schema_editor):
+    """Vincula os setores e escaninhos existentes a um armazém padrão"""
+    Armazem = apps.get_model('estoque', 'Armazem')
+    Setor = apps.get_model('estoque', 'Setor')
+    Escaninho = apps.get_model('estoque', 'Escaninho')
+    User = apps.get_model('auth', 'User')
+    banco = schema_editor.connection.alias
+    # Bancos de armazém são criados vazios; o registro de armazéns fica no banco padrão
+    if banco != 'default':
+        return
+
+    armazem, _ = Armazem.objects.using(banco).get_or_create(
+        codigo='PRINCIPAL', defaults={'nome': 'Armazém Principal'}
+    )
+    # Usuários existentes mantêm o acesso que já tinham
+    armazem.usuarios.set(User.objects.using(banco).all())
+
+    Setor.objects.using(banco).filter(armazem__isnull=True).update(armazem=armazem)
+    Escaninho.objects.using(banco).filter(armazem__isnull=True).update(
+        armazem_id=Subquery(Setor.objects.using(banco).filter(pk=OuterRef('setor_id')).values('armazem_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0003_armazem'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_armazem_principal, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0 on 2026-10-19 15:52
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0004_armazem_principal'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='escaninho',
+            options={'ordering': ['armazem_id', 'setor__letra', 'codigo'], 'verbose_name': 'Escaninho', 'verbose_name_plural': 'Escaninhos'},
+        ),
+        migrations.AlterModelOptions(
+            name='setor',
+            options={'ordering': ['armazem_id', 'letra'], 'verbose_name': 'Setor', 'verbose_name_plural': 'Setores'},
+        ),
+        migrations.AlterField(
+            model_name='escaninho',
+            name='armazem',
+            field=models.ForeignKey(db_constraint=False, editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='escaninhos', to='estoque.armazem'),
+        ),
+        migrations.AlterField(
+            model_name='setor',
+            name='armazem',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.PROTECT, related_name='setores', to='estoque.armazem'),
+        ),
+        migrations.AlterField(
+            model_name='setor',
+            name='letra',
+            field=models.CharField(max_length=1, validators=[django.core.validators.RegexValidator(message='Setor deve ser uma letra maiúscula (A-Z)', regex='^[A-Z]$')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='setor',
+            unique_together={('armazem', 'letra')},
+        ),
+        migrations.AddIndex(
+            model_name='escaninho',
+            index=models.Index(fields=['armazem', 'produto'], name='estoque_esc_armazem_6d18af_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0 on 2026-10-19 15:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0005_armazem_obrigatorio'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='produto',
+            name='estoque_minimo',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-19 16:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0006_produto_estoque_minimo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarefa',
+            name='executor',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='tarefa',
+            name='heartbeat',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
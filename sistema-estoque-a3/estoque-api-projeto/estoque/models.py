@@ -36,10 +36,50 @@ class Marca(models.Model):
     def __str__(self):
         return self.nome
 
+class Armazem(models.Model):
+    """
+    Armazém (site) ao qual pertencem setores e escaninhos. Os registros de armazém
+    ficam sempre no banco padrão; os dados de um armazém podem ser direcionados
+    a outro banco configurado em ARMAZENS_BANCOS (campo `banco`).
+    """
+    codigo = models.CharField(
+        max_length=20,
+        unique=True,
+        validators=[
+            RegexValidator(
+                regex=r'^[A-Z0-9_-]+$',
+                message='Código do armazém deve conter apenas letras maiúsculas, números, "_" ou "-"'
+            )
+        ]
+    )
+    nome = models.CharField(max_length=100)
+    banco = models.CharField(
+        max_length=50,
+        blank=True,
+        help_text='Alias em DATABASES onde ficam os dados deste armazém (vazio = banco padrão)'
+    )
+    usuarios = models.ManyToManyField(User, blank=True, related_name='armazens')
+    data_criacao = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Armazém'
+        verbose_name_plural = 'Armazéns'
+        ordering = ['codigo']
+
+    def __str__(self):
+        return f"{self.codigo} - {self.nome}"
+
+    @property
+    def alias_banco(self):
+        return self.banco or 'default'
+
 class Setor(models.Model):
+    # Sem constraint no banco: o armazém pode estar registrado em outro banco (ver Armazem.banco)
+    armazem = models.ForeignKey(
+        Armazem, on_delete=models.PROTECT, related_name='setores', db_constraint=False
+    )
     letra = models.CharField(
         max_length=1,
-        unique=True,
         validators=[
             RegexValidator(
                 regex=r'^[A-Z]$',
@@ -53,7 +93,9 @@ class Setor(models.Model):
     class Meta:
         verbose_name = 'Setor'
         verbose_name_plural = 'Setores'
-        ordering = ['letra']
+        ordering = ['armazem_id', 'letra']
+        # A letra identifica o setor dentro de cada armazém (até 26 setores por armazém)
+        unique_together = ['armazem', 'letra']
 
     def __str__(self):
         return f"Setor {self.letra}"
@@ -78,6 +120,8 @@ class Produto(models.Model):
     valor_venda = models.DecimalField(max_digits=10, decimal_places=2)
     informacoes_adicionais = models.TextField(blank=True, null=True)
     em_promocao = models.BooleanField(default=False)
+    # Ponto de reposição: abaixo desta quantidade total em escaninhos o produto deve ser reposto
+    estoque_minimo = models.PositiveIntegerField(default=0)
 
     class Meta:
         verbose_name = 'Produto'
@@ -103,6 +147,11 @@ class Escaninho(models.Model):
             )
         ]
     )
+    # Cópia do armazém do setor, para filtrar e indexar escaninhos por armazém sem join
+    armazem = models.ForeignKey(
+        Armazem, on_delete=models.PROTECT, related_name='escaninhos', db_constraint=False,
+        editable=False
+    )
     setor = models.ForeignKey(Setor, on_delete=models.CASCADE, related_name='escaninhos')
     produto = models.ForeignKey(
         Produto, 
@@ -118,16 +167,65 @@ class Escaninho(models.Model):
     class Meta:
         verbose_name = 'Escaninho'
         verbose_name_plural = 'Escaninhos'
-        ordering = ['setor__letra', 'codigo']
+        ordering = ['armazem_id', 'setor__letra', 'codigo']
         unique_together = ['setor', 'codigo']
+        indexes = [
+            # Localização de produtos dentro de um armazém
+            models.Index(fields=['armazem', 'produto']),
+        ]
 
     def __str__(self):
         return f"Escaninho {self.codigo} - Setor {self.setor.letra}"
 
+    def save(self, *args, **kwargs):
+        # O armazém do escaninho é sempre o do seu setor
+        if self.setor_id is not None:
+            self.armazem_id = self.setor.armazem_id
+        super().save(*args, **kwargs)
+
     @property
     def esta_vazio(self):
         return self.produto is None or self.quantidade == 0
 
     @property
     def localizacao_completa(self):
-        return f"{self.setor.letra}-{self.codigo}"
\ No newline at end of file
+        return f"{self.setor.letra}-{self.codigo}"
+
+class Tarefa(models.Model):
+    """Operação longa executada em segundo plano pelo worker (manage.py processar_tarefas)"""
+    PENDENTE = 'pendente'
+    EXECUTANDO = 'executando'
+    CONCLUIDA = 'concluida'
+    FALHOU = 'falhou'
+    STATUS_CHOICES = [
+        (PENDENTE, 'Pendente'),
+        (EXECUTANDO, 'Executando'),
+        (CONCLUIDA, 'Concluída'),
+        (FALHOU, 'Falhou'),
+    ]
+
+    tipo = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDENTE)
+    parametros = models.JSONField(default=dict, blank=True)
+    resultado = models.JSONField(null=True, blank=True)
+    erro = models.TextField(blank=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='tarefas')
+    data_criacao = models.DateTimeField(auto_now_add=True)
+    data_inicio = models.DateTimeField(null=True, blank=True)
+    data_conclusao = models.DateTimeField(null=True, blank=True)
+    # Worker (host:pid) que reservou a tarefa e seu último sinal de vida; tarefas em
+    # execução sem sinal há mais de TAREFAS_EXPIRACAO segundos voltam para a fila
+    executor = models.CharField(max_length=100, blank=True)
+    heartbeat = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Tarefa'
+        verbose_name_plural = 'Tarefas'
+        ordering = ['-data_criacao']
+        indexes = [
+            # Fila: busca das tarefas pendentes mais antigas
+            models.Index(fields=['status', 'data_criacao']),
+        ]
+
+    def __str__(self):
+        return f"Tarefa {self.pk} - {self.tipo} ({self.get_status_display()})"
@@ -0,0 +1,116 @@
+import sys
+import time
+from contextvars import ContextVar
+from rest_framework.fields import Field
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+# Medição da requisição em andamento (None fora do PerformanceMiddleware)
+_medicao_atual = ContextVar('medicao_atual', default=None)
+
+
+def medicao_atual():
+    """Retorna a medição da requisição corrente, se houver"""
+    return _medicao_atual.get()
+
+
+def _campo_do_serializer():
+    """
+    Percorre a pilha de chamadas procurando campos de serializer em execução
+    e monta o caminho do campo que disparou a query (ex.: ProdutoSerializer.localizacoes).
+    """
+    pilha = []
+    raiz = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        alvo = frame.f_locals.get('self')
+        if isinstance(alvo, Field):
+            if alvo.field_name:
+                pilha.append(alvo)
+            if isinstance(alvo, BaseSerializer) and not isinstance(alvo, ListSerializer):
+                raiz = type(alvo).__name__
+        frame = frame.f_back
+    if raiz is None:
+        return ''
+
+    # Um mesmo campo aparece em vários frames; vale a ocorrência mais externa
+    campos, vistos = [], set()
+    for campo in reversed(pilha):
+        if id(campo) not in vistos:
+            vistos.add(id(campo))
+            campos.append(campo.field_name)
+    return '.'.join([raiz] + campos)
+
+
+class Medicao:
+    """Métricas coletadas durante uma única requisição"""
+
+    __slots__ = (
+        'inicio', 'duracao', 'total_queries', 'tempo_db', 'tempo_serializacao',
+        'tempo_renderizacao', 'inicio_renderizacao', 'acao', 'queries', 'profundidade'
+    )
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.duracao = 0.0
+        self.total_queries = 0
+        self.tempo_db = 0.0
+        self.tempo_serializacao = 0.0
+        self.tempo_renderizacao = 0.0
+        self.inicio_renderizacao = None
+        self.acao = None
+        # SQL -> [execuções, campo do serializer que repetiu a query]
+        self.queries = {}
+        self.profundidade = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Wrapper de execução instalado com connection.execute_wrapper"""
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tempo_db += time.perf_counter() - inicio
+            self.total_queries += 1
+            registro = self.queries.get(sql)
+            if registro is None:
+                self.queries[sql] = [1, None]
+            else:
+                registro[0] += 1
+                # A pilha só é inspecionada na primeira repetição de cada SQL
+                if registro[1] is None:
+                    registro[1] = _campo_do_serializer()
+
+    def finalizar(self):
+        self.duracao = time.perf_counter() - self.inicio
+
+    def finalizar_renderizacao(self, response):
+        """Callback pós-renderização do TemplateResponse"""
+        if self.inicio_renderizacao is not None:
+            self.tempo_renderizacao = time.perf_counter() - self.inicio_renderizacao
+        return response
+
+    def duplicadas(self, limite):
+        """Queries repetidas ao menos `limite` vezes (padrão N+1)"""
+        return [
+            {'sql': sql[:500], 'execucoes': contagem, 'campo': campo or None}
+            for sql, (contagem, campo) in self.queries.items()
+            if contagem >= limite
+        ]
+
+
+class MedicaoSerializerMixin:
+    """Acumula na medição da requisição o tempo gasto serializando objetos"""
+
+    def to_representation(self, instance):
+        medicao = _medicao_atual.get()
+        if medicao is None:
+            return super().to_representation(instance)
+
+        # Serializers aninhados não são contados duas vezes
+        medicao.profundidade += 1
+        inicio = time.perf_counter() if medicao.profundidade == 1 else None
+        try:
+            return super().to_representation(instance)
+        finally:
+            medicao.profundidade -= 1
+            if inicio is not None:
+                medicao.tempo_serializacao += time.perf_counter() - inicio
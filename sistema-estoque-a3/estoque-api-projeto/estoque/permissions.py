@@ -1,4 +1,11 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
+from .models import Armazem
+
+def armazens_do_usuario(user):
+    """Armazéns acessíveis ao usuário: todos para administradores, senão os vinculados"""
+    if user.is_staff:
+        return Armazem.objects.all()
+    return Armazem.objects.filter(usuarios=user)
 
 class IsAdminOrReadOnly(BasePermission):
     """
@@ -31,4 +38,21 @@ class IsOwnerOrAdmin(BasePermission):
         if hasattr(obj, 'user'):
             return obj.user == request.user
         
-        return False
\ No newline at end of file
+        return False
+
+class TemAcessoAoArmazem(BasePermission):
+    """
+    Permissão por armazém que permite acesso ao objeto apenas para:
+    - Administradores
+    - Usuários vinculados ao armazém do objeto
+    """
+    
+    def has_object_permission(self, request, view, obj):
+        if request.user.is_staff:
+            return True
+        
+        armazem_id = getattr(obj, 'armazem_id', None)
+        if armazem_id is None:
+            return True
+        
+        return armazens_do_usuario(request.user).filter(pk=armazem_id).exists()
@@ -1,8 +1,31 @@
+from django.conf import settings
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Categoria, Marca, Setor, Produto, Escaninho
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from .models import Armazem, Categoria, Marca, Setor, Produto, Escaninho, Tarefa
+from .performance import MedicaoSerializerMixin
+from .permissions import armazens_do_usuario
 
-class CategoriaSerializer(serializers.ModelSerializer):
+# Bases de todos os serializers do app: o tempo de serialização de qualquer
+# endpoint entra na medição da requisição (Server-Timing)
+class SerializerBase(MedicaoSerializerMixin, serializers.Serializer):
+    pass
+
+class ModelSerializerBase(MedicaoSerializerMixin, serializers.ModelSerializer):
+    pass
+
+class ArmazemSerializer(ModelSerializerBase):
+    class Meta:
+        model = Armazem
+        fields = ['id', 'codigo', 'nome', 'banco', 'data_criacao']
+
+    def validate_banco(self, value):
+        if value and value not in settings.DATABASES:
+            raise serializers.ValidationError(f'Banco "{value}" não está configurado em ARMAZENS_BANCOS.')
+        return value
+
+class CategoriaSerializer(ModelSerializerBase):
     total_produtos = serializers.SerializerMethodField()
 
     class Meta:
@@ -12,7 +35,7 @@ class CategoriaSerializer(serializers.ModelSerializer):
     def get_total_produtos(self, obj):
         return obj.produtos.count()
 
-class MarcaSerializer(serializers.ModelSerializer):
+class MarcaSerializer(ModelSerializerBase):
     total_produtos = serializers.SerializerMethodField()
 
     class Meta:
@@ -23,7 +46,7 @@ class MarcaSerializer(serializers.ModelSerializer):
         return obj.produtos.count()
 
 # Serializer básico do Produto (sem detalhes para evitar recursão)
-class ProdutoBasicoSerializer(serializers.ModelSerializer):
+class ProdutoBasicoSerializer(ModelSerializerBase):
     categoria_nome = serializers.CharField(source='categoria.nome', read_only=True)
     marca_nome = serializers.CharField(source='marca.nome', read_only=True)
 
@@ -36,7 +59,7 @@ class ProdutoBasicoSerializer(serializers.ModelSerializer):
         ]
 
 # Serializer básico do Escaninho (sem detalhes para evitar recursão)
-class EscaninhoBasicoSerializer(serializers.ModelSerializer):
+class EscaninhoBasicoSerializer(ModelSerializerBase):
     produto_nome = serializers.CharField(source='produto.nome', read_only=True)
     localizacao_completa = serializers.ReadOnlyField()
 
@@ -47,27 +70,67 @@ class EscaninhoBasicoSerializer(serializers.ModelSerializer):
             'localizacao_completa', 'data_atualizacao'
         ]
 
-class SetorSerializer(serializers.ModelSerializer):
+class ArmazemPadrao:
+    """
+    Armazém assumido quando o setor é enviado sem "armazem": o do próprio setor
+    (edição), o da requisição (X-Armazem/?armazem=) ou o único acessível ao usuário.
+    """
+    requires_context = True
+
+    def __call__(self, serializer_field):
+        instance = serializer_field.parent.instance
+        if instance is not None:
+            return instance.armazem
+        view = serializer_field.context.get('view')
+        if getattr(view, 'armazem', None) is not None:
+            return view.armazem
+        armazens = list(armazens_do_usuario(serializer_field.context['request'].user)[:2])
+        if len(armazens) == 1:
+            return armazens[0]
+        raise serializers.ValidationError('Informe o armazém no campo "armazem" ou no cabeçalho X-Armazem.')
+
+class SetorSerializer(ModelSerializerBase):
+    armazem = serializers.PrimaryKeyRelatedField(queryset=Armazem.objects.all(), default=ArmazemPadrao())
     total_escaninhos = serializers.SerializerMethodField()
-    escaninhos = serializers.SerializerMethodField()
+    # Os escaninhos do setor ficam no sub-recurso paginado /api/setores/{id}/escaninhos/
+    escaninhos_url = serializers.HyperlinkedIdentityField(view_name='setor-escaninhos')
+    resumo_escaninhos = serializers.SerializerMethodField()
 
     class Meta:
         model = Setor
-        fields = ['id', 'letra', 'descricao', 'data_criacao', 'total_escaninhos', 'escaninhos']
+        fields = [
+            'id', 'armazem', 'letra', 'descricao', 'data_criacao', 'total_escaninhos',
+            'escaninhos_url', 'resumo_escaninhos'
+        ]
+
+    def validate_armazem(self, value):
+        # Escaninho.armazem é uma cópia do armazém do setor: mover o setor os deixaria inconsistentes
+        if self.instance is not None and value.pk != self.instance.armazem_id:
+            raise serializers.ValidationError('O armazém de um setor não pode ser alterado.')
+        return value
 
     def get_total_escaninhos(self, obj):
         return obj.escaninhos.count()
 
-    def get_escaninhos(self, obj):
-        # Só incluir escaninhos na visualização detalhada (detail view)
-        request = self.context.get('request')
-        if request and hasattr(request, 'resolver_match') and request.resolver_match:
-            if hasattr(request.resolver_match, 'url_name') and request.resolver_match.url_name and 'detail' in request.resolver_match.url_name:
-                escaninhos = obj.escaninhos.all()
-                return EscaninhoBasicoSerializer(escaninhos, many=True).data
-        return []
-
-class ProdutoSerializer(serializers.ModelSerializer):
+    def get_resumo_escaninhos(self, obj):
+        # Resumo compacto opcional (?resumo=true no detalhe), calculado com uma única query
+        if not self.context.get('incluir_resumo'):
+            return None
+        resumo = obj.escaninhos.aggregate(
+            total=Count('id'),
+            ocupados=Count('id', filter=Q(produto__isnull=False, quantidade__gt=0)),
+            quantidade_total=Coalesce(Sum('quantidade'), 0),
+        )
+        resumo['vazios'] = resumo['total'] - resumo['ocupados']
+        return resumo
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if not self.context.get('incluir_resumo'):
+            data.pop('resumo_escaninhos', None)
+        return data
+
+class ProdutoSerializer(ModelSerializerBase):
     categoria_detalhes = CategoriaSerializer(source='categoria', read_only=True)
     marca_detalhes = MarcaSerializer(source='marca', read_only=True)
     margem_lucro = serializers.ReadOnlyField()
@@ -79,22 +142,39 @@ class ProdutoSerializer(serializers.ModelSerializer):
             'id', 'nome', 'codigo_registro', 'codigo_barras',
             'categoria', 'categoria_detalhes', 'marca', 'marca_detalhes',
             'data_cadastro', 'custo', 'valor_venda', 'informacoes_adicionais',
-            'em_promocao', 'margem_lucro', 'localizacoes'
+            'em_promocao', 'estoque_minimo', 'margem_lucro', 'localizacoes'
         ]
 
     def get_localizacoes(self, obj):
-        escaninhos = obj.escaninhos.filter(quantidade__gt=0)
+        # Pré-carregado pelo ProdutoViewSet já no escopo de armazéns da requisição
+        escaninhos = getattr(obj, 'localizacoes_visiveis', None)
+        if escaninhos is None:
+            escaninhos = obj.escaninhos.filter(quantidade__gt=0).select_related('setor')
+            view = self.context.get('view')
+            permitidos = view.armazens_permitidos() if hasattr(view, 'armazens_permitidos') else None
+            if permitidos is not None:
+                escaninhos = escaninhos.filter(armazem__in=permitidos)
+        escaninhos = list(escaninhos)
+        if not escaninhos:
+            return []
+
+        # Letras de setor se repetem entre armazéns: a localização inclui o código do armazém.
+        # Os códigos ficam no banco padrão e são lidos uma vez por requisição.
+        if 'codigos_armazem' not in self.context:
+            self.context['codigos_armazem'] = dict(Armazem.objects.values_list('pk', 'codigo'))
+        codigos = self.context['codigos_armazem']
         return [
             {
+                'armazem': codigos.get(escaninho.armazem_id),
                 'setor': escaninho.setor.letra,
                 'escaninho': escaninho.codigo,
                 'quantidade': escaninho.quantidade,
-                'localizacao_completa': escaninho.localizacao_completa
+                'localizacao_completa': f'{codigos.get(escaninho.armazem_id)}/{escaninho.localizacao_completa}'
             }
             for escaninho in escaninhos
         ]
 
-class EscaninhoSerializer(serializers.ModelSerializer):
+class EscaninhoSerializer(ModelSerializerBase):
     setor_letra = serializers.CharField(source='setor.letra', read_only=True)
     produto_detalhes = ProdutoBasicoSerializer(source='produto', read_only=True)
     esta_vazio = serializers.ReadOnlyField()
@@ -103,12 +183,58 @@ class EscaninhoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Escaninho
         fields = [
-            'id', 'codigo', 'setor', 'setor_letra',
+            'id', 'armazem', 'codigo', 'setor', 'setor_letra',
             'produto', 'produto_detalhes', 'quantidade',
             'data_criacao', 'data_atualizacao', 'esta_vazio', 'localizacao_completa'
         ]
 
-class UserSerializer(serializers.ModelSerializer):
+# Serializers de entrada das operações em massa sobre produtos
+class PromocaoEmMassaSerializer(SerializerBase):
+    em_promocao = serializers.BooleanField()
+    todos = serializers.BooleanField(default=False)
+
+class ReajustePrecoSerializer(SerializerBase):
+    campo = serializers.ChoiceField(choices=['valor_venda', 'custo'], default='valor_venda')
+    percentual = serializers.DecimalField(max_digits=7, decimal_places=2, required=False, min_value=-100)
+    valor = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    todos = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if ('percentual' in attrs) == ('valor' in attrs):
+            raise serializers.ValidationError('Informe apenas um entre "percentual" e "valor".')
+        return attrs
+
+class EnvelhecimentoSerializer(SerializerBase):
+    """Linha do relatório de envelhecimento/reposição (calculada no banco)"""
+    id = serializers.IntegerField()
+    nome = serializers.CharField()
+    codigo_registro = serializers.CharField()
+    categoria_nome = serializers.CharField()
+    marca_nome = serializers.CharField()
+    data_cadastro = serializers.DateTimeField()
+    idade_dias = serializers.SerializerMethodField()
+    faixa_idade = serializers.CharField()
+    quantidade_total = serializers.IntegerField()
+    estoque_minimo = serializers.IntegerField()
+    abaixo_minimo = serializers.BooleanField()
+    posicao_fifo = serializers.IntegerField()
+
+    def get_idade_dias(self, obj):
+        return (self.context['agora'] - obj['data_cadastro']).days
+
+class TarefaSerializer(ModelSerializerBase):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    user_nome = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = Tarefa
+        fields = [
+            'id', 'tipo', 'status', 'status_display', 'parametros', 'resultado', 'erro',
+            'user', 'user_nome', 'data_criacao', 'data_inicio', 'data_conclusao'
+        ]
+        read_only_fields = fields
+
+class UserSerializer(ModelSerializerBase):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'is_staff', 'is_superuser']
@@ -0,0 +1,165 @@
+import csv
+import io
+import traceback
+from datetime import timedelta
+from pathlib import Path
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import Q
+from django.utils import timezone
+from .bancos import banco_do_armazem
+from .filters import ProdutoFilter
+from .models import Armazem, Produto, Escaninho, Tarefa
+
+# Funções executáveis pelo worker, indexadas pelo tipo da tarefa
+TAREFAS = {}
+
+
+def tarefa(tipo):
+    """Registra a função como executável em segundo plano com o tipo informado"""
+    def decorator(func):
+        TAREFAS[tipo] = func
+        return func
+    return decorator
+
+
+def diretorio_tarefas():
+    """Diretório onde as tarefas leem uploads e gravam os arquivos gerados"""
+    diretorio = Path(settings.TAREFAS_DIR)
+    diretorio.mkdir(parents=True, exist_ok=True)
+    return diretorio
+
+
+def enfileirar(tipo, parametros=None, user=None):
+    """Cria uma tarefa pendente; o worker a executará assim que houver processo livre"""
+    if tipo not in TAREFAS:
+        raise ValueError(f'Tipo de tarefa desconhecido: {tipo}')
+    return Tarefa.objects.create(tipo=tipo, parametros=parametros or {}, user=user)
+
+
+def reservar(tarefa_id, executor):
+    """
+    Marca a tarefa como em execução pelo `executor` (host:pid) se ela ainda estiver pendente.
+    O UPDATE condicional garante que dois workers não peguem a mesma tarefa.
+    """
+    agora = timezone.now()
+    return Tarefa.objects.filter(pk=tarefa_id, status=Tarefa.PENDENTE).update(
+        status=Tarefa.EXECUTANDO, data_inicio=agora, executor=executor, heartbeat=agora
+    ) == 1
+
+
+def renovar(tarefa_ids, executor):
+    """Sinal de vida do worker para as tarefas que ele está executando"""
+    return Tarefa.objects.filter(pk__in=tarefa_ids, status=Tarefa.EXECUTANDO, executor=executor).update(
+        heartbeat=timezone.now()
+    )
+
+
+def recuperar_interrompidas():
+    """
+    Devolve à fila as tarefas em execução cujo worker parou de dar sinal de vida há mais
+    de TAREFAS_EXPIRACAO segundos (restart/deploy de qualquer instância). Tarefas de
+    workers ativos, inclusive de outras instâncias, são mantidas.
+    A importação retoma do checkpoint; as exportações são refeitas.
+    """
+    limite = timezone.now() - timedelta(seconds=settings.TAREFAS_EXPIRACAO)
+    return Tarefa.objects.filter(status=Tarefa.EXECUTANDO).filter(
+        Q(heartbeat__lt=limite) | Q(heartbeat__isnull=True)
+    ).update(status=Tarefa.PENDENTE, data_inicio=None, executor='', heartbeat=None)
+
+
+def devolver(tarefa_id, executor):
+    """Devolve à fila uma tarefa reservada por `executor` que não chegou a ser iniciada"""
+    return Tarefa.objects.filter(pk=tarefa_id, status=Tarefa.EXECUTANDO, executor=executor).update(
+        status=Tarefa.PENDENTE, data_inicio=None, executor='', heartbeat=None
+    )
+
+
+def marcar_falha(tarefa_id, erro):
+    """Registra a falha de uma tarefa cujo processo não conseguiu gravar o resultado"""
+    Tarefa.objects.filter(pk=tarefa_id, status=Tarefa.EXECUTANDO).update(
+        status=Tarefa.FALHOU, erro=erro, data_conclusao=timezone.now()
+    )
+    return Tarefa.FALHOU
+
+
+def executar(tarefa_id):
+    """Executa uma tarefa já reservada e grava o resultado (roda no processo do pool)"""
+    instancia = Tarefa.objects.get(pk=tarefa_id)
+    try:
+        instancia.resultado = TAREFAS[instancia.tipo](instancia)
+        instancia.status = Tarefa.CONCLUIDA
+    except Exception:
+        instancia.erro = traceback.format_exc()
+        instancia.status = Tarefa.FALHOU
+    instancia.data_conclusao = timezone.now()
+    instancia.save(update_fields=['resultado', 'status', 'erro', 'data_conclusao'])
+    return instancia.status
+
+
+def _armazem(instancia):
+    """Armazém informado na requisição que criou a tarefa (define o banco consultado)"""
+    codigo = instancia.parametros.get('armazem')
+    return Armazem.objects.get(codigo=codigo) if codigo else None
+
+
+def _exportar_csv(instancia, cabecalho, linhas):
+    nome = f'tarefa_{instancia.pk}.csv'
+    total = 0
+    with open(diretorio_tarefas() / nome, 'w', newline='', encoding='utf-8') as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(cabecalho)
+        for linha in linhas:
+            escritor.writerow(linha)
+            total += 1
+    return {'arquivo': nome, 'linhas': total}
+
+
+@tarefa('exportar_produtos')
+def exportar_produtos(instancia):
+    """Exporta produtos (com os filtros do ProdutoFilter) no formato aceito pelo importar_estoque"""
+    colunas = [
+        'nome', 'codigo_registro', 'codigo_barras', 'categoria__nome', 'marca__nome',
+        'custo', 'valor_venda', 'informacoes_adicionais', 'em_promocao', 'estoque_minimo'
+    ]
+    cabecalho = [coluna.split('__')[0] for coluna in colunas]
+    with banco_do_armazem(_armazem(instancia)):
+        queryset = ProdutoFilter(instancia.parametros.get('filtros', {}), queryset=Produto.objects.all()).qs
+        linhas = queryset.order_by('pk').distinct().values_list(*colunas).iterator(chunk_size=2000)
+        return _exportar_csv(instancia, cabecalho, linhas)
+
+
+@tarefa('exportar_escaninhos')
+def exportar_escaninhos(instancia):
+    """Exporta escaninhos no formato aceito pelo importar_estoque"""
+    filtros = instancia.parametros.get('filtros', {})
+    armazens = instancia.parametros.get('armazens')
+    with banco_do_armazem(_armazem(instancia)):
+        # Mesmos campos de filtro do EscaninhoViewSet
+        queryset = Escaninho.objects.filter(**{
+            campo: filtros[campo] for campo in ('setor', 'produto', 'setor__letra') if filtros.get(campo)
+        })
+        if armazens is not None:
+            queryset = queryset.filter(armazem__in=armazens)
+        linhas = queryset.order_by('pk').values_list(
+            'setor__letra', 'codigo', 'produto__codigo_registro', 'quantidade'
+        ).iterator(chunk_size=2000)
+        return _exportar_csv(instancia, ['setor', 'codigo', 'produto', 'quantidade'], linhas)
+
+
+@tarefa('importar_estoque')
+def importar_estoque(instancia):
+    """Executa o comando importar_estoque sobre um arquivo enviado pela API"""
+    diretorio = diretorio_tarefas()
+    saida, erros = io.StringIO(), io.StringIO()
+    call_command(
+        'importar_estoque',
+        **{instancia.parametros['tipo']: str(diretorio / instancia.parametros['arquivo'])},
+        checkpoint=str(diretorio / f'tarefa_{instancia.pk}.checkpoint.json'),
+        erros=str(diretorio / f'tarefa_{instancia.pk}_erros.csv'),
+        retomar=True,
+        armazem=instancia.parametros.get('armazem'),
+        stdout=saida,
+        stderr=erros,
+    )
+    return {'saida': saida.getvalue(), 'arquivo': f'tarefa_{instancia.pk}_erros.csv'}
@@ -1,3 +1,527 @@
-from django.test import TestCase
+import csv
+import json
+import logging
+import tempfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework import serializers as drf_serializers
+from rest_framework.test import APIClient
+from . import serializers
+from .management.commands.processar_tarefas import Command as ProcessarTarefas
+from .models import Armazem, Categoria, Marca, Setor, Produto, Escaninho, Tarefa
+from .performance import MedicaoSerializerMixin
+from .tarefas import executar, recuperar_interrompidas, renovar, reservar
 
-# Create your tests here.
+# Cache em memória: o FileBasedCache padrão é compartilhado entre execuções
+CACHE_TESTES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def setUpModule():
+    # O log de cada requisição (PerformanceMiddleware) poluiria a saída dos testes
+    logging.getLogger('estoque.performance').setLevel(logging.ERROR)
+
+
+def tearDownModule():
+    logging.getLogger('estoque.performance').setLevel(logging.NOTSET)
+
+
+@override_settings(CACHES=CACHE_TESTES)
+class EstoqueTestCase(TestCase):
+    """
+    Base com dois armazéns (PRINCIPAL, criado pela migração 0004, e SP),
+    um administrador e um usuário vinculado apenas ao PRINCIPAL.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.principal = Armazem.objects.get(codigo='PRINCIPAL')
+        self.sp = Armazem.objects.create(codigo='SP', nome='São Paulo')
+        self.admin = User.objects.create_user('admin', is_staff=True)
+        self.usuario = User.objects.create_user('usuario')
+        self.principal.usuarios.add(self.usuario)
+        self.categoria = Categoria.objects.create(nome='Eletrônicos')
+        self.marca = Marca.objects.create(nome='Samsung', cnpj='00.000.000/0001-00')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def criar_produto(self, codigo, **campos):
+        campos.setdefault('custo', Decimal('5.00'))
+        campos.setdefault('valor_venda', Decimal('10.00'))
+        return Produto.objects.create(
+            nome=f'Produto {codigo}', codigo_registro=codigo, codigo_barras=str(7890000 + Produto.objects.count()),
+            categoria=self.categoria, marca=self.marca, **campos
+        )
+
+    def criar_escaninhos(self, setor, quantidade, produto=None, estoque=1):
+        return [
+            Escaninho.objects.create(setor=setor, codigo=str(i), produto=produto, quantidade=estoque if produto else 0)
+            for i in range(1, quantidade + 1)
+        ]
+
+
+class MapaTests(EstoqueTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.setor_principal = Setor.objects.create(armazem=self.principal, letra='A')
+        self.setor_sp = Setor.objects.create(armazem=self.sp, letra='A')
+        self.produto_sp = self.criar_produto('SP001')
+        self.criar_escaninhos(self.setor_principal, 2)
+        self.criar_escaninhos(self.setor_sp, 1, produto=self.produto_sp, estoque=4)
+
+    def test_usuario_ve_apenas_setores_do_seu_armazem(self):
+        self.client.force_authenticate(self.usuario)
+        resposta = self.client.get('/api/setores/mapa/')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual([setor['armazem'] for setor in resposta.data['setores']], [self.principal.pk])
+        self.assertEqual(resposta.data['produtos'], {})
+
+    def test_formato_colunar_e_etag(self):
+        resposta = self.client.get('/api/setores/mapa/')
+        self.assertEqual(resposta.status_code, 200)
+        setores = {setor['armazem']: setor for setor in resposta.data['setores']}
+        self.assertEqual(set(setores), {self.principal.pk, self.sp.pk})
+        self.assertEqual(setores[self.principal.pk]['codigos'], ['1', '2'])
+        self.assertEqual(setores[self.principal.pk]['vazios'], [True, True])
+        self.assertEqual(setores[self.sp.pk]['produtos'], [self.produto_sp.pk])
+        self.assertEqual(setores[self.sp.pk]['quantidades'], [4])
+        self.assertEqual(setores[self.sp.pk]['vazios'], [False])
+        self.assertEqual(resposta.data['produtos'], {self.produto_sp.pk: self.produto_sp.nome})
+
+        etag = resposta['ETag']
+        self.assertEqual(self.client.get('/api/setores/mapa/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Escaninho.objects.filter(setor=self.setor_principal, codigo='1').update(quantidade=1)
+        Escaninho.objects.get(setor=self.setor_principal, codigo='1').save()
+        self.assertNotEqual(self.client.get('/api/setores/mapa/')['ETag'], etag)
+
+
+    def test_escaninhos_em_ordem_numerica(self):
+        Escaninho.objects.bulk_create([
+            Escaninho(setor=self.setor_principal, armazem=self.principal, codigo=str(i)) for i in range(3, 12)
+        ])
+        resposta = self.client.get('/api/setores/mapa/')
+        setor = next(setor for setor in resposta.data['setores'] if setor['id'] == self.setor_principal.pk)
+        self.assertEqual(setor['codigos'], [str(i) for i in range(1, 12)])
+
+
+class EnvelhecimentoTests(EstoqueTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.produto = self.criar_produto('PROD001', estoque_minimo=5)
+        self.criar_escaninhos(Setor.objects.create(armazem=self.principal, letra='A'), 3, produto=self.produto)
+        self.criar_escaninhos(Setor.objects.create(armazem=self.sp, letra='B'), 1, produto=self.produto, estoque=4)
+
+    def test_produto_em_varios_escaninhos_aparece_uma_vez(self):
+        for filtro, quantidade in [('armazem=PRINCIPAL', 3), ('setor=A', 3), ('setor=B', 4), ('', 7)]:
+            with self.subTest(filtro=filtro):
+                resposta = self.client.get(f'/api/produtos/envelhecimento/?{filtro}')
+                self.assertEqual(resposta.status_code, 200)
+                self.assertEqual(resposta.data['count'], 1)
+                linha = resposta.data['results'][0]
+                self.assertEqual(linha['posicao_fifo'], 1)
+                self.assertEqual(linha['quantidade_total'], quantidade)
+                self.assertEqual(linha['abaixo_minimo'], quantidade < 5)
+                resumo = {faixa['faixa']: faixa for faixa in resposta.data['resumo']}
+                self.assertEqual(resumo['0-30']['produtos'], 1)
+                self.assertEqual(resumo['0-30']['quantidade'], quantidade)
+
+
+    def test_posicao_fifo_calculada_antes_dos_filtros_do_relatorio(self):
+        # Dois produtos mais novos na mesma categoria; só o mais novo fica abaixo do mínimo
+        segundo = self.criar_produto('PROD002')
+        terceiro = self.criar_produto('PROD003', estoque_minimo=1)
+        Produto.objects.filter(pk=self.produto.pk).update(data_cadastro=timezone.now() - timedelta(days=2))
+        Produto.objects.filter(pk=segundo.pk).update(data_cadastro=timezone.now() - timedelta(days=1))
+        Produto.objects.filter(pk=self.produto.pk).update(estoque_minimo=0)
+
+        resposta = self.client.get('/api/produtos/envelhecimento/?abaixo_minimo=true')
+        self.assertEqual([linha['id'] for linha in resposta.data['results']], [terceiro.pk])
+        self.assertEqual(resposta.data['results'][0]['posicao_fifo'], 3)
+
+
+class OperacoesEmMassaTests(EstoqueTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.produtos = [self.criar_produto(f'PROD00{i}') for i in range(1, 4)]
+
+    def reajustar(self, **dados):
+        return self.client.post('/api/produtos/reajustar/', {'todos': True, **dados}, format='json')
+
+    def test_reajuste_percentual_arredonda_apenas_o_valor_final(self):
+        for percentual, esperado in [('12.5', '11.25'), ('-33.33', '6.67')]:
+            with self.subTest(percentual=percentual):
+                Produto.objects.update(valor_venda=Decimal('10.00'))
+                resposta = self.reajustar(percentual=percentual)
+                self.assertEqual(resposta.status_code, 200)
+                self.assertEqual(resposta.data['atualizados'], 3)
+                self.assertEqual(
+                    set(Produto.objects.values_list('valor_venda', flat=True)), {Decimal(esperado)}
+                )
+
+    def test_reajuste_por_valor_nunca_fica_negativo(self):
+        resposta = self.reajustar(valor='-15.00', campo='custo')
+        self.assertEqual(resposta.data, {'atualizados': 3, 'campo': 'custo'})
+        self.assertEqual(set(Produto.objects.values_list('custo', flat=True)), {Decimal('0.00')})
+
+    def test_promocao_em_massa_atualiza_apenas_os_filtrados(self):
+        outra = Categoria.objects.create(nome='Limpeza')
+        Produto.objects.filter(pk=self.produtos[0].pk).update(categoria=outra)
+        resposta = self.client.post(
+            '/api/produtos/promocao_em_massa/?categoria_nome=eletr', {'em_promocao': True}, format='json'
+        )
+        self.assertEqual(resposta.data, {'atualizados': 2, 'em_promocao': True})
+        self.assertEqual(
+            list(Produto.objects.filter(em_promocao=True).order_by('pk').values_list('pk', flat=True)),
+            [self.produtos[1].pk, self.produtos[2].pk]
+        )
+
+    def test_sem_filtro_exige_todos(self):
+        resposta = self.client.post('/api/produtos/promocao_em_massa/', {'em_promocao': True}, format='json')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertFalse(Produto.objects.filter(em_promocao=True).exists())
+
+    def test_filtros_vazios_exigem_todos(self):
+        for filtro in ['marca_nome=', 'armazem=', 'search=%20', 'em_promocao=', 'preco_min=abc']:
+            with self.subTest(filtro=filtro):
+                resposta = self.client.post(
+                    f'/api/produtos/promocao_em_massa/?{filtro}', {'em_promocao': True}, format='json'
+                )
+                self.assertEqual(resposta.status_code, 400)
+                resposta = self.client.post(f'/api/produtos/reajustar/?{filtro}', {'valor': '1.00'}, format='json')
+                self.assertEqual(resposta.status_code, 400)
+        self.assertFalse(Produto.objects.filter(em_promocao=True).exists())
+
+    def test_apenas_administradores(self):
+        self.client.force_authenticate(self.usuario)
+        self.assertEqual(self.reajustar(percentual='10').status_code, 403)
+
+
+class LocalizacoesTests(EstoqueTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.produto = self.criar_produto('PROD001')
+        self.criar_escaninhos(Setor.objects.create(armazem=self.principal, letra='A'), 1, produto=self.produto)
+        self.criar_escaninhos(Setor.objects.create(armazem=self.sp, letra='A'), 1, produto=self.produto)
+
+    def localizacoes(self):
+        resposta = self.client.get('/api/produtos/')
+        self.assertEqual(resposta.status_code, 200)
+        return [item['localizacao_completa'] for item in resposta.data['results'][0]['localizacoes']]
+
+    def test_localizacoes_incluem_o_armazem(self):
+        self.assertEqual(sorted(self.localizacoes()), ['PRINCIPAL/A-1', 'SP/A-1'])
+
+    def test_usuario_ve_apenas_localizacoes_do_seu_armazem(self):
+        self.client.force_authenticate(self.usuario)
+        self.assertEqual(self.localizacoes(), ['PRINCIPAL/A-1'])
+
+
+class ImportarEstoqueTests(EstoqueTestCase):
+
+    def setUp(self):
+        super().setUp()
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.diretorio = Path(diretorio.name)
+        self.checkpoint = self.diretorio / 'checkpoint.json'
+
+    def arquivo(self, nome, linhas):
+        caminho = self.diretorio / nome
+        caminho.write_text('\n'.join(linhas) + '\n', encoding='utf-8')
+        return str(caminho)
+
+    def importar(self, **arquivos):
+        erros = self.diretorio / 'erros.csv'
+        call_command(
+            'importar_estoque', armazem='PRINCIPAL', checkpoint=str(self.checkpoint), erros=str(erros),
+            stdout=StringIO(), stderr=StringIO(), **arquivos
+        )
+        with open(erros, encoding='utf-8') as arquivo:
+            return [(int(linha['linha']), linha['motivo']) for linha in csv.DictReader(arquivo)]
+
+    def test_marcas_rejeita_cnpj_invalido_e_duplicados(self):
+        erros = self.importar(marcas=self.arquivo('marcas.csv', [
+            'nome,cnpj',
+            'Nestlé,11.111.111/0001-11',
+            'Unilever,11111111000111',
+            'Samsung,22.222.222/0001-22',
+            'Nestlé,33.333.333/0001-33',
+        ]))
+        self.assertEqual(erros, [
+            (3, 'CNPJ deve estar no formato XX.XXX.XXX/XXXX-XX'),
+            (4, 'nome "Samsung" já cadastrado'),
+            (5, 'nome "Nestlé" duplicado no arquivo'),
+        ])
+        self.assertEqual(sorted(Marca.objects.values_list('nome', flat=True)), ['Nestlé', 'Samsung'])
+
+    def test_produtos_rejeita_codigo_de_barras_invalido_e_duplicados(self):
+        self.criar_produto('PROD001')
+        erros = self.importar(produtos=self.arquivo('produtos.csv', [
+            'nome,codigo_registro,codigo_barras,categoria,marca,custo,valor_venda',
+            'Galaxy,PROD002,789100,Eletrônicos,Samsung,"1.000,00",1500.00',
+            'Galaxy,PROD003,78A9,Eletrônicos,Samsung,10,20',
+            'Galaxy,PROD001,789200,Eletrônicos,Samsung,10,20',
+            'Galaxy,PROD004,789100,Eletrônicos,Samsung,10,20',
+        ]))
+        self.assertEqual(erros, [
+            (3, 'Código de barras deve conter apenas números'),
+            (4, 'codigo_registro "PROD001" já cadastrado'),
+            (5, 'codigo_barras "789100" duplicado no arquivo'),
+        ])
+        self.assertEqual(Produto.objects.get(codigo_registro='PROD002').custo, Decimal('1000.00'))
+
+    def test_escaninhos_unicos_por_setor_e_codigo(self):
+        setor = Setor.objects.create(armazem=self.principal, letra='A')
+        Setor.objects.create(armazem=self.principal, letra='B')
+        Escaninho.objects.create(setor=setor, codigo='1')
+        erros = self.importar(escaninhos=self.arquivo('escaninhos.csv', [
+            'setor,codigo,produto,quantidade',
+            'a,1,,0',
+            'A,2,,0',
+            'B,2,,0',
+            'A,2,,0',
+            'C,1,,0',
+        ]))
+        self.assertEqual(erros, [
+            (2, '_chave "A-1" já cadastrado'),
+            (5, '_chave "A-2" duplicado no arquivo'),
+            (6, 'setor "C" não encontrado'),
+        ])
+        self.assertEqual(
+            sorted(Escaninho.objects.values_list('setor__letra', 'codigo')), [('A', '1'), ('A', '2'), ('B', '2')]
+        )
+
+    def test_retomar_pula_linhas_ja_processadas_e_limpa_o_checkpoint(self):
+        caminho = self.arquivo('categorias.csv', ['nome', 'Limpeza', 'Bebidas', 'Higiene'])
+        # Execução anterior interrompida após as duas primeiras linhas
+        self.checkpoint.write_text(json.dumps({str(Path(caminho).resolve()): 2}))
+        call_command(
+            'importar_estoque', categorias=caminho, armazem='PRINCIPAL', checkpoint=str(self.checkpoint),
+            retomar=True, stdout=StringIO()
+        )
+        self.assertEqual(sorted(Categoria.objects.values_list('nome', flat=True)), ['Eletrônicos', 'Higiene'])
+        self.assertFalse(self.checkpoint.exists())
+
+        # O mesmo caminho editado é importado desde o início
+        self.arquivo('categorias.csv', ['nome', 'Limpeza', 'Bebidas'])
+        call_command(
+            'importar_estoque', categorias=caminho, armazem='PRINCIPAL', checkpoint=str(self.checkpoint),
+            retomar=True, stdout=StringIO()
+        )
+        self.assertEqual(Categoria.objects.count(), 4)
+
+
+class ImportarViaApiTests(EstoqueTestCase):
+
+    def setUp(self):
+        super().setUp()
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        configuracao = self.settings(TAREFAS_DIR=diretorio.name)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def importar(self, nome, conteudo, **extra):
+        arquivo = SimpleUploadedFile(nome, conteudo)
+        return self.client.post('/api/produtos/importar/', {'tipo': 'categorias', 'arquivo': arquivo}, **extra)
+
+    def test_sem_armazem_com_varios_armazens_retorna_400(self):
+        resposta = self.importar('categorias.csv', b'nome\nLimpeza\n')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertFalse(Tarefa.objects.exists())
+
+    def test_formato_nao_suportado_retorna_400(self):
+        resposta = self.importar('categorias.txt', b'nome\nLimpeza\n', HTTP_X_ARMAZEM='SP')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertFalse(Tarefa.objects.exists())
+
+    def test_planilha_excel(self):
+        from openpyxl import Workbook
+        planilha = Workbook()
+        planilha.active.append(['nome'])
+        planilha.active.append(['Limpeza'])
+        conteudo = tempfile.SpooledTemporaryFile()
+        planilha.save(conteudo)
+        conteudo.seek(0)
+
+        resposta = self.importar('categorias.xlsx', conteudo.read(), HTTP_X_ARMAZEM='SP')
+        self.assertEqual(resposta.status_code, 202)
+        tarefa = Tarefa.objects.get(pk=resposta.data['id'])
+        self.assertEqual(tarefa.parametros['armazem'], 'SP')
+        self.assertEqual(executar(tarefa.pk), Tarefa.CONCLUIDA)
+        self.assertTrue(Categoria.objects.filter(nome='Limpeza').exists())
+
+
+class WorkerTarefasTests(TestCase):
+
+    def test_apenas_tarefas_sem_sinal_de_vida_voltam_para_a_fila(self):
+        interrompida = Tarefa.objects.create(tipo='exportar_produtos')
+        ativa = Tarefa.objects.create(tipo='exportar_produtos')
+        concluida = Tarefa.objects.create(tipo='exportar_produtos', status=Tarefa.CONCLUIDA)
+        self.assertTrue(reservar(interrompida.pk, 'instancia-a:1'))
+        self.assertTrue(reservar(ativa.pk, 'instancia-b:1'))
+        # Worker da instância A parou de renovar há mais que TAREFAS_EXPIRACAO
+        Tarefa.objects.filter(pk=interrompida.pk).update(
+            heartbeat=timezone.now() - timedelta(seconds=settings.TAREFAS_EXPIRACAO + 1)
+        )
+
+        self.assertEqual(recuperar_interrompidas(), 1)
+        interrompida.refresh_from_db()
+        ativa.refresh_from_db()
+        concluida.refresh_from_db()
+        self.assertEqual(interrompida.status, Tarefa.PENDENTE)
+        self.assertIsNone(interrompida.data_inicio)
+        self.assertEqual(interrompida.executor, '')
+        self.assertEqual((ativa.status, ativa.executor), (Tarefa.EXECUTANDO, 'instancia-b:1'))
+        self.assertEqual(concluida.status, Tarefa.CONCLUIDA)
+
+    def test_renovar_apenas_as_tarefas_do_proprio_worker(self):
+        tarefa = Tarefa.objects.create(tipo='exportar_produtos')
+        reservar(tarefa.pk, 'instancia-a:1')
+        self.assertEqual(renovar([tarefa.pk], 'instancia-b:1'), 0)
+        self.assertEqual(renovar([tarefa.pk], 'instancia-a:1'), 1)
+
+    def test_pool_quebrado_marca_falha_sem_derrubar_o_worker(self):
+        tarefa = Tarefa.objects.create(tipo='exportar_produtos', status=Tarefa.EXECUTANDO)
+        futuro = Future()
+        futuro.set_exception(BrokenProcessPool('processo encerrado'))
+        comando = ProcessarTarefas(stdout=StringIO(), stderr=StringIO())
+        self.assertTrue(comando._finalizar(futuro, tarefa.pk))
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, Tarefa.FALHOU)
+        self.assertIn('BrokenProcessPool', tarefa.erro)
+
+
+class MetricasTests(TestCase):
+
+    def com_token(self, token):
+        return override_settings(ESTOQUE_PERFORMANCE={**settings.ESTOQUE_PERFORMANCE, 'METRICAS_TOKEN': token})
+
+    def test_sem_token_fechado_em_producao(self):
+        with self.com_token(''), self.settings(DEBUG=False):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+        with self.com_token(''), self.settings(DEBUG=True):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_token_obrigatorio(self):
+        with self.com_token('segredo'):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer outro').status_code, 401)
+            resposta = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer segredo')
+            self.assertEqual(resposta.status_code, 200)
+            self.assertIn(b'estoque_requisicoes_total', resposta.content)
+
+
+class EscaninhosDoSetorTests(EstoqueTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.setor = Setor.objects.create(armazem=self.principal, letra='A')
+        produto = self.criar_produto('PROD001')
+        escaninhos = self.criar_escaninhos(self.setor, 25)
+        Escaninho.objects.filter(pk__in=[e.pk for e in escaninhos[:3]]).update(produto=produto, quantidade=2)
+
+    def test_escaninhos_paginados(self):
+        resposta = self.client.get(f'/api/setores/{self.setor.pk}/escaninhos/')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.data['count'], 25)
+        self.assertEqual(len(resposta.data['results']), 20)
+        self.assertIsNotNone(resposta.data['next'])
+
+    def test_escaninhos_em_ordem_numerica(self):
+        resposta = self.client.get(f'/api/setores/{self.setor.pk}/escaninhos/')
+        self.assertEqual([e['codigo'] for e in resposta.data['results']], [str(i) for i in range(1, 21)])
+
+    def test_resumo_apenas_quando_solicitado(self):
+        resposta = self.client.get(f'/api/setores/{self.setor.pk}/')
+        self.assertNotIn('resumo_escaninhos', resposta.data)
+        self.assertTrue(resposta.data['escaninhos_url'].endswith(f'/api/setores/{self.setor.pk}/escaninhos/'))
+
+        resposta = self.client.get(f'/api/setores/{self.setor.pk}/?resumo=true')
+        self.assertEqual(
+            resposta.data['resumo_escaninhos'],
+            {'total': 25, 'ocupados': 3, 'quantidade_total': 6, 'vazios': 22}
+        )
+
+
+class SetorArmazemTests(EstoqueTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.setor = Setor.objects.create(armazem=self.principal, letra='A')
+        self.criar_escaninhos(self.setor, 2)
+
+    def test_armazem_do_setor_nao_pode_ser_alterado(self):
+        resposta = self.client.patch(f'/api/setores/{self.setor.pk}/', {'armazem': self.sp.pk}, format='json')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('armazem', resposta.data)
+        self.assertEqual(set(Escaninho.objects.values_list('armazem_id', flat=True)), {self.principal.pk})
+
+        resposta = self.client.patch(
+            f'/api/setores/{self.setor.pk}/', {'armazem': self.principal.pk, 'descricao': 'Eletrônicos'}, format='json'
+        )
+        self.assertEqual(resposta.status_code, 200)
+
+
+    def test_criar_setor_sem_armazem_usa_o_da_requisicao(self):
+        resposta = self.client.post('/api/setores/', {'letra': 'B'}, format='json', HTTP_X_ARMAZEM='SP')
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual(resposta.data['armazem'], self.sp.pk)
+
+    def test_criar_setor_sem_armazem_usa_o_unico_acessivel(self):
+        self.client.force_authenticate(self.usuario)
+        resposta = self.client.post('/api/setores/', {'letra': 'B'}, format='json')
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual(resposta.data['armazem'], self.principal.pk)
+
+        # Mesma letra no mesmo armazém continua rejeitada
+        resposta = self.client.post('/api/setores/', {'letra': 'B'}, format='json')
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_criar_setor_com_varios_armazens_exige_o_armazem(self):
+        resposta = self.client.post('/api/setores/', {'letra': 'B'}, format='json')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('armazem', resposta.data)
+
+
+class PerformanceMiddlewareTests(EstoqueTestCase):
+
+    def test_cabecalho_server_timing(self):
+        resposta = self.client.get('/api/setores/')
+        self.assertEqual(resposta.status_code, 200)
+        metricas = [parte.split(';')[0] for parte in resposta['Server-Timing'].split(', ')]
+        self.assertEqual(metricas, ['db', 'serializer', 'render', 'total'])
+
+    def test_queries_repetidas_sinalizadas(self):
+        # total_produtos faz uma query por categoria
+        for i in range(6):
+            Categoria.objects.create(nome=f'Categoria {i}')
+        with self.assertLogs('estoque.performance', 'WARNING') as logs:
+            self.client.get('/api/categorias/')
+        dados = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(dados['acao'], 'CategoriaViewSet.list')
+        self.assertTrue(dados['lenta'])
+        duplicada = dados['queries_duplicadas'][0]
+        self.assertGreaterEqual(duplicada['execucoes'], 6)
+        self.assertIn('total_produtos', duplicada['campo'])
+
+    def test_todos_os_serializers_sao_medidos(self):
+        for nome, classe in vars(serializers).items():
+            if isinstance(classe, type) and issubclass(classe, drf_serializers.BaseSerializer):
+                if classe.__module__ == serializers.__name__:
+                    with self.subTest(serializer=nome):
+                        self.assertTrue(issubclass(classe, MedicaoSerializerMixin))
@@ -4,12 +4,14 @@ from . import views
 
 # Criar router e registrar ViewSets
 router = DefaultRouter()
+router.register(r'armazens', views.ArmazemViewSet)
 router.register(r'categorias', views.CategoriaViewSet)
 router.register(r'marcas', views.MarcaViewSet)
 router.register(r'setores', views.SetorViewSet)
 router.register(r'produtos', views.ProdutoViewSet)
 router.register(r'escaninhos', views.EscaninhoViewSet)
 router.register(r'usuarios', views.UserViewSet)
+router.register(r'jobs', views.TarefaViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
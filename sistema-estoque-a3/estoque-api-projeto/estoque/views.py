@@ -1,18 +1,133 @@
+import hmac
+import os
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import router, transaction
+from django.db.models import (
+    BooleanField, Case, Count, DecimalField, F, IntegerField, OuterRef, Prefetch, Q, Subquery, Sum, Value, When,
+    Window
+)
+from django.db.models.functions import Cast, Coalesce, Greatest, Round, RowNumber
+from django.utils import timezone
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import reverse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import Categoria, Marca, Setor, Produto, Escaninho
+from .bancos import usar_banco, restaurar_banco
+from .models import Armazem, Categoria, Marca, Setor, Produto, Escaninho, Tarefa
 from .serializers import (
-    CategoriaSerializer, MarcaSerializer, SetorSerializer,
-    ProdutoSerializer, EscaninhoSerializer, UserSerializer
+    ArmazemSerializer, CategoriaSerializer, MarcaSerializer, SetorSerializer, EscaninhoBasicoSerializer,
+    ProdutoSerializer, EscaninhoSerializer, TarefaSerializer, UserSerializer,
+    PromocaoEmMassaSerializer, ReajustePrecoSerializer, EnvelhecimentoSerializer
 )
 from .filters import ProdutoFilter
-from .permissions import IsAdminOrReadOnly
+from .mapa import obter_mapa
+from .metricas import gerar_metricas
+from .permissions import IsAdminOrReadOnly, IsOwnerOrAdmin, TemAcessoAoArmazem, armazens_do_usuario
+from .tarefas import enfileirar, diretorio_tarefas
+
+def resposta_tarefa(request, tarefa):
+    """Resposta 202 padrão para operações enfileiradas como tarefa"""
+    url = request.build_absolute_uri(reverse('tarefa-detail', args=[tarefa.pk]))
+    return Response(
+        {'id': tarefa.pk, 'tipo': tarefa.tipo, 'status': tarefa.status, 'url': url},
+        status=status.HTTP_202_ACCEPTED,
+        headers={'Location': url}
+    )
+
+class ArmazemMixin:
+    """
+    Escopo por armazém para os viewsets de estoque:
+    - o armazém é informado pelo código no cabeçalho X-Armazem ou em ?armazem=
+    - as queries da requisição vão para o banco do armazém (Armazem.banco)
+    - sem armazém informado, usuários comuns só enxergam os armazéns aos quais estão vinculados
+    `campo_armazem` é o campo do model que aponta para o armazém (None para o catálogo).
+    """
+    campo_armazem = None
+    armazem = None
+    _token_banco = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        codigo = request.headers.get('X-Armazem') or request.query_params.get('armazem')
+        if codigo:
+            self.armazem = armazens_do_usuario(request.user).filter(codigo__iexact=codigo).first()
+            if self.armazem is None:
+                raise NotFound(f'Armazém "{codigo}" não encontrado.')
+            self._token_banco = usar_banco(self.armazem.alias_banco)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self._token_banco is not None:
+            restaurar_banco(self._token_banco)
+            self._token_banco = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def armazens_permitidos(self):
+        """Ids dos armazéns visíveis na requisição (None = todos)"""
+        if self.armazem is not None:
+            return [self.armazem.pk]
+        if self.request.user.is_staff:
+            return None
+        return list(armazens_do_usuario(self.request.user).values_list('pk', flat=True))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Catálogo (sem campo de armazém) não precisa consultar os armazéns do usuário
+        if self.campo_armazem is None:
+            return queryset
+        permitidos = self.armazens_permitidos()
+        if permitidos is None:
+            return queryset
+        return queryset.filter(**{f'{self.campo_armazem}__in': permitidos})
+
+    def _verificar_armazem(self, dados):
+        # Setores informam o armazém diretamente; escaninhos, através do setor
+        armazem = dados.get('armazem')
+        armazem_id = armazem.pk if armazem else getattr(dados.get('setor'), 'armazem_id', None)
+        permitidos = self.armazens_permitidos()
+        if armazem_id is not None and permitidos is not None and armazem_id not in permitidos:
+            raise PermissionDenied('Você não tem acesso a este armazém.')
+
+    def _parametros_exportacao(self, request):
+        """Filtros da listagem e escopo de armazéns repassados às tarefas de exportação"""
+        return {
+            'filtros': request.query_params.dict(),
+            'armazem': self.armazem.codigo if self.armazem else None,
+            'armazens': self.armazens_permitidos(),
+        }
+
+    def perform_create(self, serializer):
+        self._verificar_armazem(serializer.validated_data)
+        super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        self._verificar_armazem(serializer.validated_data)
+        super().perform_update(serializer)
+
+class ArmazemViewSet(viewsets.ModelViewSet):
+    queryset = Armazem.objects.all()
+    serializer_class = ArmazemSerializer
+    permission_classes = [IsAdminOrReadOnly]
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['codigo', 'nome']
+    ordering_fields = ['codigo', 'nome', 'data_criacao']
+    ordering = ['codigo']
+
+    def get_queryset(self):
+        return armazens_do_usuario(self.request.user)
 
-class CategoriaViewSet(viewsets.ModelViewSet):
+# Faixas de idade (dias desde o cadastro) do relatório de envelhecimento
+FAIXAS_IDADE = [(30, '0-30'), (90, '31-90'), (180, '91-180'), (365, '181-365')]
+FAIXA_IDADE_MAXIMA = '365+'
+
+class CategoriaViewSet(ArmazemMixin, viewsets.ModelViewSet):
     queryset = Categoria.objects.all()
     serializer_class = CategoriaSerializer
     permission_classes = [IsAuthenticated]
@@ -21,7 +136,7 @@ class CategoriaViewSet(viewsets.ModelViewSet):
     ordering_fields = ['nome', 'data_registro']
     ordering = ['nome']
 
-class MarcaViewSet(viewsets.ModelViewSet):
+class MarcaViewSet(ArmazemMixin, viewsets.ModelViewSet):
     queryset = Marca.objects.all()
     serializer_class = MarcaSerializer
     permission_classes = [IsAuthenticated]
@@ -30,17 +145,52 @@ class MarcaViewSet(viewsets.ModelViewSet):
     ordering_fields = ['nome', 'data_inclusao']
     ordering = ['nome']
 
-class SetorViewSet(viewsets.ModelViewSet):
+class SetorViewSet(ArmazemMixin, viewsets.ModelViewSet):
     queryset = Setor.objects.all()
     serializer_class = SetorSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, TemAcessoAoArmazem]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['letra', 'descricao']
     ordering_fields = ['letra', 'data_criacao']
-    ordering = ['letra']
+    ordering = ['armazem_id', 'letra']
+    campo_armazem = 'armazem'
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['incluir_resumo'] = (
+            self.action == 'retrieve'
+            and self.request.query_params.get('resumo', '').lower() in ('1', 'true', 'sim')
+        )
+        return context
+
+    @action(detail=False, methods=['get'])
+    def mapa(self, request):
+        """Mapa de ocupação de todos os setores em formato colunar, para a interface do armazém"""
+        timeout = settings.MAPA_CACHE_TIMEOUT
+        mapa, etag = obter_mapa(timeout, self.armazens_permitidos())
+        headers = {'ETag': etag, 'Cache-Control': f'private, max-age={timeout}'}
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(mapa, headers=headers)
+
+    @action(detail=True, methods=['get'])
+    def escaninhos(self, request, pk=None):
+        """Escaninhos do setor, paginados (substitui a lista aninhada no detalhe do setor)"""
+        setor = self.get_object()
+        # Ordem numérica dos códigos ('2' antes de '10'); o próprio código desempata a paginação
+        escaninhos = Escaninho.objects.filter(setor=setor).select_related('setor', 'produto').order_by(
+            Cast('codigo', IntegerField()), 'codigo'
+        )
+        page = self.paginate_queryset(escaninhos)
+        if page is not None:
+            serializer = EscaninhoBasicoSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = EscaninhoBasicoSerializer(escaninhos, many=True)
+        return Response(serializer.data)
 
-class ProdutoViewSet(viewsets.ModelViewSet):
-    queryset = Produto.objects.select_related('categoria', 'marca').prefetch_related('escaninhos__setor')
+class ProdutoViewSet(ArmazemMixin, viewsets.ModelViewSet):
+    queryset = Produto.objects.select_related('categoria', 'marca')
     serializer_class = ProdutoSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -49,6 +199,16 @@ class ProdutoViewSet(viewsets.ModelViewSet):
     ordering_fields = ['nome', 'data_cadastro', 'valor_venda', 'custo']
     ordering = ['-data_cadastro']
 
+    def get_queryset(self):
+        # Localizações com estoque, restritas aos armazéns visíveis na requisição
+        escaninhos = Escaninho.objects.filter(quantidade__gt=0).select_related('setor')
+        permitidos = self.armazens_permitidos()
+        if permitidos is not None:
+            escaninhos = escaninhos.filter(armazem__in=permitidos)
+        return super().get_queryset().prefetch_related(
+            Prefetch('escaninhos', queryset=escaninhos, to_attr='localizacoes_visiveis')
+        )
+
     def update(self, request, *args, **kwargs):
         # Verificar se está tentando alterar o campo em_promocao
         if 'em_promocao' in request.data:
@@ -79,6 +239,111 @@ class ProdutoViewSet(viewsets.ModelViewSet):
             'results': serializer.data
         })
 
+    @action(detail=False, methods=['get'])
+    def envelhecimento(self, request):
+        """
+        Relatório FIFO de envelhecimento e reposição, calculado no banco:
+        - quantidade total em escaninhos e faixa de idade de cada produto
+        - produtos abaixo do estoque mínimo (ponto de reposição)
+        - posição FIFO dentro da categoria (mais antigo = 1)
+        Aceita os filtros do ProdutoFilter, além de ?faixa= e ?abaixo_minimo=true.
+        """
+        agora = timezone.now()
+        # Quantidade restrita ao mesmo armazém/setor/escaninho usado no filtro
+        estoque = Escaninho.objects.filter(produto=OuterRef('pk'))
+        permitidos = self.armazens_permitidos()
+        if permitidos is not None:
+            estoque = estoque.filter(armazem__in=permitidos)
+        if request.query_params.get('setor'):
+            estoque = estoque.filter(setor__letra__iexact=request.query_params['setor'])
+        if request.query_params.get('escaninho'):
+            estoque = estoque.filter(codigo__iexact=request.query_params['escaninho'])
+        estoque = estoque.values('produto').annotate(total=Sum('quantidade')).values('total')
+
+        # Os filtros por escaninho fazem joins (uma linha por escaninho); a janela e as
+        # agregações rodam sobre o conjunto limpo de produtos selecionados por id
+        filtrados = self.filter_queryset(Produto.objects.all()).order_by().values('pk')
+        produtos = Produto.objects.filter(pk__in=Subquery(filtrados)).annotate(
+            quantidade_total=Coalesce(Subquery(estoque), 0, output_field=IntegerField()),
+            faixa_idade=Case(
+                *[
+                    When(data_cadastro__gte=agora - timedelta(days=dias), then=Value(faixa))
+                    for dias, faixa in FAIXAS_IDADE
+                ],
+                default=Value(FAIXA_IDADE_MAXIMA),
+            ),
+        ).annotate(
+            abaixo_minimo=Case(
+                When(quantidade_total__lt=F('estoque_minimo'), then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField(),
+            ),
+        )
+        if request.query_params.get('faixa'):
+            produtos = produtos.filter(faixa_idade=request.query_params['faixa'])
+        if request.query_params.get('abaixo_minimo', '').lower() in ('1', 'true', 'sim'):
+            produtos = produtos.filter(abaixo_minimo=True)
+
+        # Resumo por faixa em uma única query de agregação
+        resumo = {
+            linha['faixa_idade']: linha
+            for linha in produtos.order_by().values('faixa_idade').annotate(
+                produtos=Count('pk'),
+                quantidade=Sum('quantidade_total'),
+                abaixo_minimo_total=Count('pk', filter=Q(abaixo_minimo=True)),
+            )
+        }
+        faixas = [faixa for _, faixa in FAIXAS_IDADE] + [FAIXA_IDADE_MAXIMA]
+        resumo = [
+            {
+                'faixa': faixa,
+                'produtos': resumo.get(faixa, {}).get('produtos', 0),
+                'quantidade': resumo.get(faixa, {}).get('quantidade') or 0,
+                'abaixo_minimo': resumo.get(faixa, {}).get('abaixo_minimo_total', 0),
+            }
+            for faixa in faixas
+        ]
+
+        linhas = produtos.annotate(
+            categoria_nome=F('categoria__nome'),
+            marca_nome=F('marca__nome'),
+        ).order_by('data_cadastro', 'pk').values(
+            'id', 'nome', 'codigo_registro', 'categoria_id', 'categoria_nome', 'marca_nome', 'data_cadastro',
+            'faixa_idade', 'quantidade_total', 'estoque_minimo', 'abaixo_minimo'
+        )
+
+        contexto = {'agora': agora}
+        page = self.paginate_queryset(linhas)
+        if page is not None:
+            self._posicoes_fifo(filtrados, page)
+            serializer = EnvelhecimentoSerializer(page, many=True, context=contexto)
+            response = self.get_paginated_response(serializer.data)
+            response.data['resumo'] = resumo
+            return response
+
+        linhas = self._posicoes_fifo(filtrados, list(linhas))
+        serializer = EnvelhecimentoSerializer(linhas, many=True, context=contexto)
+        return Response({'resumo': resumo, 'results': serializer.data})
+
+    def _posicoes_fifo(self, filtrados, linhas):
+        """
+        Preenche a posição FIFO de cada linha dentro da sua categoria, entre os produtos
+        selecionados pelo ProdutoFilter. A janela roda em uma query própria para não ser
+        afetada por ?faixa=/?abaixo_minimo=; restringir às categorias da página não
+        altera a numeração, que é particionada por categoria.
+        """
+        categorias = {linha['categoria_id'] for linha in linhas}
+        posicoes = dict(
+            Produto.objects.filter(pk__in=Subquery(filtrados), categoria_id__in=categorias).annotate(
+                posicao=Window(
+                    RowNumber(), partition_by=[F('categoria_id')], order_by=[F('data_cadastro').asc(), F('pk').asc()]
+                ),
+            ).values_list('pk', 'posicao')
+        ) if categorias else {}
+        for linha in linhas:
+            linha['posicao_fifo'] = posicoes[linha['id']]
+        return linhas
+
     @action(detail=False, methods=['get'])
     def promocoes(self, request):
         """Endpoint para listar apenas produtos em promoção"""
@@ -104,15 +369,120 @@ class ProdutoViewSet(viewsets.ModelViewSet):
             'produto': serializer.data
         })
 
-class EscaninhoViewSet(viewsets.ModelViewSet):
+    def _queryset_em_massa(self, request, todos):
+        """
+        Produtos selecionados pelos filtros da listagem (ProdutoFilter/search) para
+        operações em massa. Sem filtros, exige "todos": true para evitar acidentes.
+        """
+        if not todos:
+            # Filtros com valor vazio são ignorados pelo django-filter: contam apenas os aplicados
+            filtro = ProdutoFilter(request.query_params, queryset=Produto.objects.all(), request=request)
+            aplicados = filtro.is_valid() and any(
+                valor not in (None, '', []) for valor in filtro.form.cleaned_data.values()
+            )
+            if not aplicados and not request.query_params.get('search', '').strip():
+                return None
+        return self.filter_queryset(Produto.objects.all())
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminOrReadOnly])
+    def promocao_em_massa(self, request):
+        """Coloca ou retira da promoção todos os produtos filtrados com um único UPDATE (apenas admin)"""
+        dados = PromocaoEmMassaSerializer(data=request.data)
+        dados.is_valid(raise_exception=True)
+        produtos = self._queryset_em_massa(request, dados.validated_data['todos'])
+        if produtos is None:
+            return Response(
+                {'detail': 'Informe ao menos um filtro ou "todos": true.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic(using=router.db_for_write(Produto)):
+            atualizados = produtos.update(em_promocao=dados.validated_data['em_promocao'])
+        return Response({'atualizados': atualizados, 'em_promocao': dados.validated_data['em_promocao']})
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminOrReadOnly])
+    def reajustar(self, request):
+        """
+        Reajusta valor_venda ou custo de todos os produtos filtrados com um único UPDATE (apenas admin).
+        Aceita "percentual" (ex.: -10 para 10% de desconto) ou "valor" absoluto a somar.
+        """
+        dados = ReajustePrecoSerializer(data=request.data)
+        dados.is_valid(raise_exception=True)
+        produtos = self._queryset_em_massa(request, dados.validated_data['todos'])
+        if produtos is None:
+            return Response(
+                {'detail': 'Informe ao menos um filtro ou "todos": true.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        campo = dados.validated_data['campo']
+        decimal = DecimalField(max_digits=10, decimal_places=2)
+        if 'percentual' in dados.validated_data:
+            # Fator com casas suficientes (percentual tem 2 casas); só o valor final é arredondado
+            fator = 1 + dados.validated_data['percentual'] / Decimal(100)
+            novo_valor = F(campo) * Value(fator, output_field=DecimalField(max_digits=12, decimal_places=6))
+        else:
+            novo_valor = F(campo) + Value(dados.validated_data['valor'], output_field=decimal)
+        # Arredonda para centavos e nunca deixa o preço negativo
+        novo_valor = Greatest(Round(novo_valor, 2), Value(Decimal('0.00'), output_field=decimal), output_field=decimal)
+
+        with transaction.atomic(using=router.db_for_write(Produto)):
+            atualizados = produtos.update(**{campo: novo_valor})
+        return Response({'atualizados': atualizados, 'campo': campo})
+
+    @action(detail=False, methods=['post'])
+    def exportar(self, request):
+        """Enfileira a exportação em CSV dos produtos filtrados (mesmos filtros da listagem)"""
+        tarefa = enfileirar('exportar_produtos', self._parametros_exportacao(request), request.user)
+        return resposta_tarefa(request, tarefa)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminOrReadOnly])
+    def importar(self, request):
+        """Enfileira a importação de um arquivo CSV/Excel (apenas admin)"""
+        arquivo = request.FILES.get('arquivo')
+        tipo = request.data.get('tipo', 'produtos')
+        if arquivo is None:
+            return Response({'detail': 'Envie o arquivo no campo "arquivo".'}, status=status.HTTP_400_BAD_REQUEST)
+        if tipo not in ('categorias', 'marcas', 'setores', 'produtos', 'escaninhos'):
+            return Response({'detail': f'Tipo de importação inválido: {tipo}.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        extensao = os.path.splitext(arquivo.name.lower())[1]
+        if extensao not in ('.csv', '.xlsx', '.xlsm'):
+            return Response(
+                {'detail': 'Formato não suportado: envie um arquivo .csv ou .xlsx.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Mesma regra do comando importar_estoque: sem armazém informado, só se houver um único
+        armazem = self.armazem
+        if armazem is None:
+            armazens = list(armazens_do_usuario(request.user)[:2])
+            if len(armazens) != 1:
+                return Response(
+                    {'detail': 'Informe o armazém de destino no cabeçalho X-Armazem.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            armazem = armazens[0]
+
+        nome = f'upload_{uuid.uuid4().hex}{extensao}'
+        with open(diretorio_tarefas() / nome, 'wb') as destino:
+            for parte in arquivo.chunks():
+                destino.write(parte)
+
+        parametros = {'tipo': tipo, 'arquivo': nome, 'armazem': armazem.codigo}
+        tarefa = enfileirar('importar_estoque', parametros, request.user)
+        return resposta_tarefa(request, tarefa)
+
+class EscaninhoViewSet(ArmazemMixin, viewsets.ModelViewSet):
     queryset = Escaninho.objects.select_related('setor', 'produto__categoria', 'produto__marca')
     serializer_class = EscaninhoSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, TemAcessoAoArmazem]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['setor', 'produto', 'setor__letra']
     search_fields = ['codigo', 'setor__letra', 'produto__nome']
     ordering_fields = ['codigo', 'setor__letra', 'quantidade', 'data_criacao']
-    ordering = ['setor__letra', 'codigo']
+    ordering = ['armazem_id', 'setor__letra', 'codigo']
+    campo_armazem = 'armazem'
 
     @action(detail=False, methods=['get'])
     def vazios(self, request):
@@ -138,6 +508,39 @@ class EscaninhoViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(escaninhos_ocupados, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'])
+    def exportar(self, request):
+        """Enfileira a exportação em CSV dos escaninhos filtrados"""
+        tarefa = enfileirar('exportar_escaninhos', self._parametros_exportacao(request), request.user)
+        return resposta_tarefa(request, tarefa)
+
+class TarefaViewSet(viewsets.ReadOnlyModelViewSet):
+    """Acompanhamento das tarefas em segundo plano (/api/jobs/)"""
+    queryset = Tarefa.objects.select_related('user')
+    serializer_class = TarefaSerializer
+    permission_classes = [IsAuthenticated, IsOwnerOrAdmin]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['status', 'tipo']
+    ordering_fields = ['data_criacao', 'data_conclusao']
+    ordering = ['-data_criacao']
+
+    def get_queryset(self):
+        # Usuários comuns só enxergam as próprias tarefas
+        queryset = super().get_queryset()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(user=self.request.user)
+        return queryset
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Baixa o arquivo gerado por uma tarefa concluída"""
+        tarefa = self.get_object()
+        nome = (tarefa.resultado or {}).get('arquivo')
+        caminho = diretorio_tarefas() / nome if nome else None
+        if tarefa.status != Tarefa.CONCLUIDA or caminho is None or not caminho.exists():
+            raise Http404('Arquivo não disponível para esta tarefa.')
+        return FileResponse(open(caminho, 'rb'), as_attachment=True, filename=nome)
+
 class UserViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
@@ -145,4 +548,17 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['username', 'email', 'first_name', 'last_name']
     ordering_fields = ['username', 'email', 'date_joined']
-    ordering = ['username']
\ No newline at end of file
+    ordering = ['username']
+
+def metricas(request):
+    """Endpoint /metrics no formato de texto do Prometheus"""
+    token = settings.ESTOQUE_PERFORMANCE.get('METRICAS_TOKEN')
+    if not token:
+        # Sem token, as métricas só ficam abertas em desenvolvimento
+        if not settings.DEBUG:
+            return HttpResponse(status=403)
+    elif not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        return HttpResponse(status=401)
+
+    conteudo, content_type = gerar_metricas()
+    return HttpResponse(conteudo, content_type=content_type)
\ No newline at end of file
@@ -0,0 +1,82 @@
+# Configuração do gunicorn (carregada pelo startup.sh)
+import os
+import shutil
+import time
+
+_INICIO_CONFIG = time.monotonic()
+
+# Diretório compartilhado onde cada worker grava suas métricas (arquivos mmap).
+# Precisa estar definido antes de qualquer import do prometheus_client.
+DIRETORIO_METRICAS = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/estoque-metricas')
+
+
+def _cpus():
+    # Respeita o limite de CPUs do container quando disponível
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+# Django, DRF e o app estoque são importados uma única vez no processo mestre;
+# os workers nascem por fork e compartilham essa memória (copy-on-write)
+preload_app = True
+
+# Workers e threads dimensionados pelas CPUs; GUNICORN_WORKERS/GUNICORN_THREADS sobrescrevem
+workers = int(os.environ.get('GUNICORN_WORKERS') or os.environ.get('WEB_CONCURRENCY') or 2 * _cpus() + 1)
+threads = int(os.environ.get('GUNICORN_THREADS') or 2)
+
+
+def _memoria_kb():
+    """(rss, pss, compartilhada) do processo atual em kB, lidos de /proc"""
+    valores = {}
+    try:
+        with open('/proc/self/smaps_rollup') as arquivo:
+            for linha in arquivo:
+                campo, _, resto = linha.partition(':')
+                if resto.strip().endswith('kB'):
+                    valores[campo] = int(resto.split()[0])
+    except OSError:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss, rss, 0
+    return valores.get('Rss', 0), valores.get('Pss', 0), valores.get('Shared_Clean', 0) + valores.get('Shared_Dirty', 0)
+
+
+def _formatar_memoria():
+    rss, pss, compartilhada = _memoria_kb()
+    return f'RSS {rss / 1024:.1f} MB, PSS {pss / 1024:.1f} MB, compartilhada {compartilhada / 1024:.1f} MB'
+
+
+def on_starting(server):
+    # Chamado após o preload: o tempo desde a leitura da configuração é a carga da aplicação
+    server.log.info('Aplicação carregada no mestre em %.2fs', time.monotonic() - _INICIO_CONFIG)
+
+    # Descarta métricas de execuções anteriores
+    shutil.rmtree(DIRETORIO_METRICAS, ignore_errors=True)
+    os.makedirs(DIRETORIO_METRICAS, exist_ok=True)
+
+
+def when_ready(server):
+    # ESTOQUE_INICIO é exportado pelo startup.sh no início do boot do container
+    inicio = os.environ.get('ESTOQUE_INICIO')
+    desde_boot = f', {time.time() - float(inicio):.2f}s desde o início do startup.sh' if inicio else ''
+    server.log.info(
+        'Pronto para atender: %d worker(s) x %d thread(s)%s; mestre com %s',
+        server.num_workers, server.cfg.threads, desde_boot, _formatar_memoria()
+    )
+
+
+def pre_fork(server, worker):
+    # Conexões abertas no mestre não podem ser herdadas pelos workers
+    from django.db import connections
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    worker.log.info('Worker %s pronto: %s', worker.pid, _formatar_memoria())
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
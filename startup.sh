@@ -1,17 +1,24 @@
 #!/bin/bash
 
-echo "Iniciando aplicacao Django no Azure..."
+# Marca o inicio do boot; o gunicorn reporta o tempo ate estar pronto (gunicorn.conf.py)
+export ESTOQUE_INICIO=$(date +%s.%N)
 
-# Instalar dependencias
-pip install -r requirements.txt
+echo "Iniciando aplicacao Django no Azure..."
 
-# Coletar arquivos estaticos
-python manage.py collectstatic --noinput
+# Dependencias sao instaladas no build (Oryx / GitHub Actions), nao a cada boot.
+# Os estaticos tambem sao coletados no build; aqui apenas se o manifest nao existir.
+if [ ! -f staticfiles/staticfiles.json ]; then
+    python manage.py collectstatic --noinput
+fi
 
-# Executar migracoes
-python manage.py migrate
+# Executar migracoes somente nos bancos com alguma pendente (banco padrao e
+# bancos dos armazens em ARMAZENS_BANCOS), em um unico processo
+python manage.py migrar_bancos
 
 echo "Aplicacao configurada com sucesso!"
 
+# Worker das tarefas em segundo plano (exportacoes, importacoes)
+python manage.py processar_tarefas --processos "${TAREFAS_PROCESSOS:-2}" &
+
 # Iniciar servidor Gunicorn
-exec gunicorn --bind=0.0.0.0 --timeout 600 config.wsgi
\ No newline at end of file
+exec gunicorn --config gunicorn.conf.py --bind=0.0.0.0 --timeout 30 config.wsgi
\ No newline at end of file